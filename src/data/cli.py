@@ -0,0 +1,145 @@
+import os
+import sys
+import argparse
+
+# Single entry point for the data pipeline:
+#
+#   python src/data/cli.py extract | augment | analyze | train | evaluate | export | serve
+#
+# Each command imports its module only when it runs, so `--help` and the
+# pandas-only commands start without loading tensorflow, mediapipe, cv2,
+# sklearn or the plotting stack. Commands run from this directory, where
+# the scripts read and write their datasets, models and figures.
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def extract(args):
+    """Extract pose landmarks from the dataset images"""
+    from process_mediapipe_dataset import process_dataset
+    process_dataset(
+        batch_size=args.batch_size,
+        num_workers=args.workers or os.cpu_count(),
+        max_images_per_second=args.max_images_per_second,
+        export_csv=args.export_csv,
+        profile=args.profile
+    )
+
+def augment(args):
+    """Build the augmented, synthetic and balanced datasets"""
+    from data_augmentation import main as augment_main
+    augment_main()
+
+def analyze(args):
+    """Print the data quality report, or score the survey responses"""
+    if args.survey:
+        import pandas as pd
+        from combined_evaluation import analyze_survey_data
+        survey_df = pd.read_csv(os.path.join(DATA_DIR, 'google_form_dataset.csv'))
+        risk_mean, risk_std = analyze_survey_data(survey_df)
+        print(f"Survey risk score: mean {risk_mean:.3f}, std {risk_std:.3f}")
+    else:
+        from dataset_analysis import generate_data_quality_report
+        generate_data_quality_report()
+
+def train(args):
+    """Train the movement risk predictor (or the pose neural network) and save it"""
+    if args.neural_network:
+        from combine_datasets import main as train_network
+        train_network()
+        return
+    from real_time_evaluation import RealTimeRiskPredictor
+    predictor = RealTimeRiskPredictor(args.data, None)
+    predictor.train()
+    predictor.save(args.output)
+
+def evaluate(args):
+    """Run one of the evaluation suites"""
+    if args.suite == 'models':
+        from comprehensive_evaluation import main as evaluate_models
+        evaluate_models()
+    elif args.suite == 'network':
+        from evaluate_model import evaluate_model
+        evaluate_model()
+    elif args.suite == 'combined':
+        from combined_evaluation import evaluate_combined_risk
+        evaluate_combined_risk()
+    else:
+        from real_time_evaluation import RealTimeRiskPredictor
+        RealTimeRiskPredictor.load(args.model, args.data).evaluate_real_time_performance()
+
+def export(args):
+    """Export float16 and int8 TFLite models and compare them with Keras"""
+    from tflite_model import main as export_main
+    export_main()
+
+def serve(args):
+    """Serve a saved risk predictor over HTTP"""
+    import asyncio
+    from scoring_server import serve as serve_model
+    try:
+        asyncio.run(serve_model(args.model, args.host, args.port, max_in_flight=args.max_in_flight))
+    except KeyboardInterrupt:
+        print("Risk scoring server stopped")
+
+def build_parser():
+    default_data = os.path.join(DATA_DIR, 'mediapipe_dataset.csv')
+    default_model = os.environ.get('RISK_MODEL_PATH', os.path.join(DATA_DIR, 'risk_predictor.npz'))
+
+    parser = argparse.ArgumentParser(prog='cli.py', description='Badminton injury risk data pipeline')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('extract', help=extract.__doc__)
+    command.add_argument('--workers', type=int, default=None, help='extraction processes (default: one per core)')
+    command.add_argument('--profile', default='accurate', help='fast, balanced or accurate')
+    command.add_argument('--batch-size', type=int, default=50, help='images per cache commit')
+    command.add_argument('--max-images-per-second', type=float, default=None)
+    command.add_argument('--export-csv', action='store_true', help='also write the train split to mediapipe_dataset.csv')
+    command.set_defaults(handler=extract)
+
+    command = commands.add_parser('augment', help=augment.__doc__)
+    command.set_defaults(handler=augment)
+
+    command = commands.add_parser('analyze', help=analyze.__doc__)
+    command.add_argument('--survey', action='store_true', help='score the Google Form survey instead')
+    command.set_defaults(handler=analyze)
+
+    command = commands.add_parser('train', help=train.__doc__)
+    command.add_argument('--data', default=default_data, help='landmark dataset (CSV or binary store)')
+    command.add_argument('--output', default=default_model, help='where to save the predictor')
+    command.add_argument('--neural-network', action='store_true',
+                         help='train best_pose_model.h5 on the combined datasets instead')
+    command.set_defaults(handler=train)
+
+    command = commands.add_parser('evaluate', help=evaluate.__doc__)
+    command.add_argument('--suite', choices=['realtime', 'models', 'network', 'combined'], default='realtime',
+                         help='realtime: latency of a saved predictor; models: classifier comparison; '
+                              'network: best_pose_model.h5; combined: movement and survey risk')
+    command.add_argument('--model', default=default_model, help='saved predictor for the realtime suite')
+    command.add_argument('--data', default=default_data, help='landmark dataset for the realtime suite')
+    command.set_defaults(handler=evaluate)
+
+    command = commands.add_parser('export', help=export.__doc__)
+    command.set_defaults(handler=export)
+
+    command = commands.add_parser('serve', help=serve.__doc__)
+    command.add_argument('--model', default=default_model)
+    command.add_argument('--host', default=os.environ.get('RISK_SERVER_HOST', '127.0.0.1'))
+    command.add_argument('--port', type=int, default=int(os.environ.get('RISK_SERVER_PORT', 8765)))
+    command.add_argument('--max-in-flight', type=int, default=256, help='frames waiting or being scored at once')
+    command.set_defaults(handler=serve)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    for name in ('data', 'output', 'model'):
+        if getattr(args, name, None):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    # Sibling modules are imported by name, and the scripts resolve their
+    # relative output paths from here
+    sys.path.insert(0, DATA_DIR)
+    os.chdir(DATA_DIR)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+from statistics import NormalDist
+import numpy as np
+
+# Default working-memory budget for the blocked kernels, in megabytes
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+def _block_size(bytes_per_unit, memory_budget_mb):
+    """How many rows (or columns) of bytes_per_unit fit in the memory budget"""
+    return max(1, int(memory_budget_mb * 1024 * 1024 // max(bytes_per_unit, 1)))
+
+def mean_abs_pairwise_difference(X, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Mean of |x_if - x_jf| over all pairs of rows (i, j) and features f
+
+    Equal to np.mean(np.mean(np.abs(X[:, np.newaxis] - X), axis=1)) without
+    building the n x n x d tensor. Each feature column is sorted once, and
+    for sorted values a_0 <= ... <= a_{n-1} the sum over pairs i < j of
+    a_j - a_i is sum_k a_k * (2k - n + 1). Columns are processed in blocks
+    that fit in the memory budget.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n, d = X.shape
+    if n == 0 or d == 0:
+        return 0.0
+
+    weights = 2 * np.arange(n) - n + 1
+    cols_per_block = _block_size(n * 8 * 2, memory_budget_mb)
+    total = 0.0
+    for start in range(0, d, cols_per_block):
+        block = np.sort(X[:, start:start + cols_per_block], axis=0)
+        total += np.sum(weights @ block)
+
+    # Every unordered pair appears twice in the n x n mean
+    return 2 * total / (n * n * d)
+
+def _silhouette_rows(X, sq_norms, one_hot, counts, labels, rows, memory_budget_mb):
+    """Silhouette value of each row index in rows, against every row of X"""
+    n = len(X)
+    values = np.empty(len(rows))
+    rows_per_block = _block_size(n * 8 * 3, memory_budget_mb)
+    for start in range(0, len(rows), rows_per_block):
+        block_rows = rows[start:start + rows_per_block]
+        block = X[block_rows]
+
+        # Euclidean distances from this block to every point
+        distances = sq_norms[block_rows][:, np.newaxis] - 2 * block @ X.T + sq_norms
+        np.maximum(distances, 0, out=distances)
+        np.sqrt(distances, out=distances)
+        distances[np.arange(len(block_rows)), block_rows] = 0
+
+        # Summed distance to each cluster
+        cluster_sums = distances @ one_hot
+        own = labels[block_rows]
+        own_counts = counts[own]
+
+        a = cluster_sums[np.arange(len(block_rows)), own] / np.maximum(own_counts - 1, 1)
+        mean_to_other = cluster_sums / counts
+        mean_to_other[np.arange(len(block_rows)), own] = np.inf
+        b = np.min(mean_to_other, axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s = (b - a) / np.maximum(a, b)
+        # Points in singleton clusters score 0, as in sklearn
+        values[start:start + len(block_rows)] = np.where(own_counts > 1, np.nan_to_num(s), 0.0)
+    return values
+
+def _prepare_silhouette(X, labels):
+    """Validate inputs and precompute what every silhouette block needs"""
+    X = np.asarray(X, dtype=np.float64)
+    _, labels = np.unique(labels, return_inverse=True)
+    n_clusters = labels.max() + 1 if len(labels) else 0
+    if not 2 <= n_clusters <= len(X) - 1:
+        raise ValueError(f"Number of labels is {n_clusters}. Valid values are 2 to n_samples - 1 (inclusive)")
+    one_hot = np.zeros((len(X), n_clusters))
+    one_hot[np.arange(len(X)), labels] = 1
+    counts = np.bincount(labels, minlength=n_clusters)
+    sq_norms = np.sum(X ** 2, axis=1)
+    return X, labels, one_hot, counts, sq_norms
+
+def blocked_silhouette_score(X, labels, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    """
+    Exact mean silhouette coefficient (Euclidean) in bounded memory
+
+    Distances are computed one block of rows at a time and immediately
+    reduced to per-cluster sums, so working memory stays within the budget
+    instead of growing with n^2.
+    """
+    X, labels, one_hot, counts, sq_norms = _prepare_silhouette(X, labels)
+    values = _silhouette_rows(X, sq_norms, one_hot, counts, labels, np.arange(len(X)), memory_budget_mb)
+    return float(np.mean(values))
+
+def sampled_silhouette_score(X, labels, sample_size=2000, random_state=42,
+                             memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, confidence=0.95):
+    """
+    Estimate the silhouette coefficient from a random sample of points
+
+    Each sampled point's silhouette is computed exactly against the full
+    dataset, so the sample mean is an unbiased estimate of the full score.
+    Returns (estimate, margin): the true score lies within estimate +/-
+    margin at the given confidence level (normal approximation with a
+    finite-population correction). Cost is O(sample_size * n * d).
+    """
+    X, labels, one_hot, counts, sq_norms = _prepare_silhouette(X, labels)
+    n = len(X)
+    if sample_size >= n:
+        values = _silhouette_rows(X, sq_norms, one_hot, counts, labels, np.arange(n), memory_budget_mb)
+        return float(np.mean(values)), 0.0
+
+    rng = np.random.RandomState(random_state)
+    rows = np.sort(rng.choice(n, size=sample_size, replace=False))
+    values = _silhouette_rows(X, sq_norms, one_hot, counts, labels, rows, memory_budget_mb)
+
+    # Two-sided normal quantile for the requested confidence level
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    std_error = np.std(values, ddof=1) / np.sqrt(sample_size) * np.sqrt((n - sample_size) / (n - 1))
+    return float(np.mean(values)), float(z * std_error)
+
+def silhouette(X, labels, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, sample_size=None, random_state=42):
+    """Blocked silhouette score, or the sampled estimate when sample_size is set"""
+    if sample_size is not None and sample_size < len(X):
+        return sampled_silhouette_score(X, labels, sample_size, random_state, memory_budget_mb)[0]
+    return blocked_silhouette_score(X, labels, memory_budget_mb)
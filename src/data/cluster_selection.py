@@ -0,0 +1,62 @@
+import os
+import numpy as np
+from cluster_metrics import DEFAULT_MEMORY_BUDGET_MB, silhouette
+
+# Candidate cluster counts tried by default
+DEFAULT_CLUSTER_RANGE = range(2, 6)
+
+# Above this many samples the sweep switches to MiniBatchKMeans
+MINIBATCH_THRESHOLD = 50000
+
+# Silhouette sample size used in mini-batch mode when none is given, since
+# an exact silhouette is quadratic in the number of samples
+MINIBATCH_SILHOUETTE_SAMPLE_SIZE = 10000
+
+def make_kmeans(n_clusters, n_samples, random_state=42, minibatch_threshold=MINIBATCH_THRESHOLD):
+    """KMeans for small inputs, MiniBatchKMeans once n_samples passes the threshold"""
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    if minibatch_threshold is not None and n_samples > minibatch_threshold:
+        return MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state,
+                               batch_size=4096, n_init=3)
+    return KMeans(n_clusters=n_clusters, random_state=random_state)
+
+def _fit_candidate(X, n_clusters, random_state, minibatch_threshold,
+                   memory_budget_mb, silhouette_sample_size):
+    """Fit one candidate model and score it; runs inside a joblib worker"""
+    model = make_kmeans(n_clusters, len(X), random_state, minibatch_threshold)
+    cluster_labels = model.fit_predict(X)
+    score = silhouette(X, cluster_labels, memory_budget_mb, silhouette_sample_size, random_state)
+    return model, score
+
+def select_cluster_count(X, n_clusters_range=DEFAULT_CLUSTER_RANGE, n_jobs=None, random_state=42,
+                         minibatch_threshold=MINIBATCH_THRESHOLD,
+                         memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, silhouette_sample_size=None):
+    """
+    Fit every candidate cluster count in parallel and keep the best model
+
+    Each candidate is fitted and scored in its own worker, so the sweep
+    takes about as long as the slowest single fit. Returns (n_clusters,
+    model, scores) where model is the fitted winner (its labels_ are the
+    training assignments, no refit needed) and scores lists the silhouette
+    score of every candidate in order. Ties go to the smaller count.
+    """
+    from joblib import Parallel, delayed
+
+    X = np.asarray(X, dtype=np.float64)
+    n_clusters_range = list(n_clusters_range)
+    if n_jobs is None:
+        n_jobs = min(len(n_clusters_range), os.cpu_count() or 1)
+
+    minibatch = minibatch_threshold is not None and len(X) > minibatch_threshold
+    if minibatch and silhouette_sample_size is None:
+        silhouette_sample_size = MINIBATCH_SILHOUETTE_SAMPLE_SIZE
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_candidate)(X, n_clusters, random_state, minibatch_threshold,
+                                memory_budget_mb, silhouette_sample_size)
+        for n_clusters in n_clusters_range
+    )
+
+    scores = [score for _, score in results]
+    best = int(np.argmax(scores))
+    return n_clusters_range[best], results[best][0], scores
@@ -2,12 +2,8 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout
-from tensorflow.keras.optimizers import Adam
 import os
+from landmark_store import load_landmark_frame
 
 def load_mediapipe_dataset(mediapipe_path):
     """
@@ -15,7 +11,7 @@ def load_mediapipe_dataset(mediapipe_path):
     Expected format: CSV with pose keypoints and labels
     """
     try:
-        df = pd.read_csv(mediapipe_path)
+        df = load_landmark_frame(mediapipe_path)
         # Assuming the last column is the label
         X = df.iloc[:, :-1].values
         y = df.iloc[:, -1].values
@@ -75,6 +71,10 @@ def create_model(input_shape):
     """
     Create a new model with the same architecture as the original
     """
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, Dropout
+    from tensorflow.keras.optimizers import Adam
+    
     model = Sequential([
         Dense(128, activation='relu', input_shape=input_shape),
         Dropout(0.3),
@@ -145,6 +145,8 @@ def main():
     
     # Load the existing model
     print("Loading existing model...")
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model
     try:
         model = load_model(model_path)
         print("Successfully loaded existing model")
@@ -1,17 +1,10 @@
 import os
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import roc_curve, auc, precision_recall_curve, average_precision_score
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, confusion_matrix
-import tensorflow as tf
-from imblearn.over_sampling import SMOTE
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
+from landmark_store import load_landmark_frame
+from cluster_metrics import DEFAULT_MEMORY_BUDGET_MB
+from cluster_selection import DEFAULT_CLUSTER_RANGE, select_cluster_count
+from report_artifacts import record_plot
 
 def calculate_risk_score(row):
     """Calculate a risk score from Google Form responses"""
@@ -80,8 +73,12 @@ def calculate_risk_score(row):
             
     return score
 
-def analyze_movement_patterns(mediapipe_df):
-    """Analyze movement patterns using clustering"""
+def analyze_movement_patterns(mediapipe_df, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, silhouette_sample_size=None):
+    """Analyze movement patterns using clustering
+    
+    Silhouette scores are computed in blocks within memory_budget_mb, or
+    estimated from silhouette_sample_size points when that is set.
+    """
     # Extract only the landmark coordinates (excluding visibility)
     landmark_cols = [col for col in mediapipe_df.columns 
                     if col.startswith('landmark_') and not col.endswith('_visibility')]
@@ -104,32 +101,26 @@ def analyze_movement_patterns(mediapipe_df):
     print(X.head())
     
     # Scale the features
+    from sklearn.preprocessing import StandardScaler
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
     
     # Find optimal number of clusters
-    silhouette_scores = []
-    n_clusters_range = range(2, 6)
-    
-    for n_clusters in n_clusters_range:
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        cluster_labels = kmeans.fit_predict(X_scaled)
-        silhouette_avg = silhouette_score(X_scaled, cluster_labels)
-        silhouette_scores.append(silhouette_avg)
+    n_clusters_range = DEFAULT_CLUSTER_RANGE
+    optimal_clusters, kmeans, silhouette_scores = select_cluster_count(
+        X_scaled, n_clusters_range,
+        memory_budget_mb=memory_budget_mb,
+        silhouette_sample_size=silhouette_sample_size
+    )
     
     # Plot silhouette scores
-    plt.figure(figsize=(10, 6))
-    plt.plot(list(n_clusters_range), silhouette_scores, marker='o')
-    plt.xlabel('Number of Clusters')
-    plt.ylabel('Silhouette Score')
-    plt.title('Silhouette Score vs Number of Clusters')
-    plt.savefig('silhouette_scores.png')
-    plt.close()
+    record_plot('silhouette_scores.png', 'line_plot',
+                x=list(n_clusters_range), y=np.asarray(silhouette_scores),
+                xlabel='Number of Clusters', ylabel='Silhouette Score',
+                title='Silhouette Score vs Number of Clusters')
     
-    # Use optimal number of clusters
-    optimal_clusters = n_clusters_range[np.argmax(silhouette_scores)]
-    kmeans = KMeans(n_clusters=optimal_clusters, random_state=42)
-    cluster_labels = kmeans.fit_predict(X_scaled)
+    # Reuse the assignments of the winning fit
+    cluster_labels = kmeans.labels_
     
     # Calculate movement intensity for each cluster
     movement_intensity = []
@@ -164,13 +155,10 @@ def analyze_survey_data(google_forms_df):
     google_forms_df['normalized_risk_score'] = google_forms_df['risk_score'] / max_possible_score
     
     # Plot risk score distribution
-    plt.figure(figsize=(10, 6))
-    sns.histplot(data=google_forms_df, x='normalized_risk_score', bins=20)
-    plt.xlabel('Normalized Risk Score')
-    plt.ylabel('Count')
-    plt.title('Distribution of Risk Scores from Survey Data')
-    plt.savefig('risk_score_distribution.png')
-    plt.close()
+    record_plot('risk_score_distribution.png', 'histogram',
+                values=google_forms_df['normalized_risk_score'].to_numpy(),
+                xlabel='Normalized Risk Score', ylabel='Count',
+                title='Distribution of Risk Scores from Survey Data')
     
     # Calculate risk factors correlation
     risk_factors = {
@@ -183,7 +171,6 @@ def analyze_survey_data(google_forms_df):
     }
     
     # Create correlation matrix visualization
-    plt.figure(figsize=(12, 8))
     correlation_data = []
     for factor, col in risk_factors.items():
         if col in google_forms_df.columns:
@@ -191,11 +178,11 @@ def analyze_survey_data(google_forms_df):
                                     pd.Categorical(google_forms_df[col]).codes)[0, 1]
             correlation_data.append({'Factor': factor, 'Correlation': correlation})
     
-    correlation_df = pd.DataFrame(correlation_data)
-    sns.barplot(data=correlation_df, x='Correlation', y='Factor')
-    plt.title('Correlation of Risk Factors with Overall Risk Score')
-    plt.savefig('risk_factor_correlation.png')
-    plt.close()
+    correlation_df = pd.DataFrame(correlation_data, columns=['Factor', 'Correlation'])
+    record_plot('risk_factor_correlation.png', 'bar_plot',
+                values=correlation_df['Correlation'].to_numpy(), labels=correlation_df['Factor'].tolist(),
+                xlabel='Correlation', ylabel='Factor',
+                title='Correlation of Risk Factors with Overall Risk Score')
     
     return google_forms_df['normalized_risk_score'].mean(), google_forms_df['normalized_risk_score'].std()
 
@@ -207,7 +194,7 @@ def evaluate_combined_risk():
     mediapipe_path = os.path.join(current_dir, 'mediapipe_dataset.csv')
     google_forms_path = os.path.join(current_dir, 'google_form_dataset.csv')
     
-    mediapipe_df = pd.read_csv(mediapipe_path)
+    mediapipe_df = load_landmark_frame(mediapipe_path)
     google_forms_df = pd.read_csv(google_forms_path)
     
     print("\nDataset Information:")
@@ -241,22 +228,12 @@ def evaluate_combined_risk():
     
     if len(movement_risk_scores) > 0:
         # Plot combined risk assessment
-        plt.figure(figsize=(12, 6))
-        plt.subplot(1, 2, 1)
-        sns.histplot(movement_risk_scores, bins=20)
-        plt.xlabel('Movement Risk Score')
-        plt.ylabel('Count')
-        plt.title('Distribution of Movement Risk Scores')
-        
-        plt.subplot(1, 2, 2)
-        sns.histplot(data=google_forms_df['normalized_risk_score'], bins=20)
-        plt.xlabel('Survey Risk Score')
-        plt.ylabel('Count')
-        plt.title('Distribution of Survey Risk Scores')
-        
-        plt.tight_layout()
-        plt.savefig('combined_risk_distribution.png')
-        plt.close()
+        record_plot('combined_risk_distribution.png', 'histogram_panels', panels=[
+            {'values': np.asarray(movement_risk_scores), 'xlabel': 'Movement Risk Score',
+             'title': 'Distribution of Movement Risk Scores'},
+            {'values': google_forms_df['normalized_risk_score'].to_numpy(), 'xlabel': 'Survey Risk Score',
+             'title': 'Distribution of Survey Risk Scores'}
+        ])
         
         # Generate risk assessment report
         print("\nRisk Assessment Summary:")
@@ -267,17 +244,10 @@ def evaluate_combined_risk():
         print(f"- Movement risk score variation: {np.std(movement_risk_scores):.3f}")
         
         # Save cluster visualization
-        plt.figure(figsize=(10, 6))
-        for i in range(n_clusters):
-            cluster_scores = [score for score, label in zip(movement_risk_scores, cluster_labels) if label == i]
-            plt.scatter(np.full_like(cluster_scores, i), cluster_scores, alpha=0.5, label=f'Cluster {i}')
-        
-        plt.xlabel('Cluster')
-        plt.ylabel('Risk Score')
-        plt.title('Risk Scores by Movement Pattern Cluster')
-        plt.legend()
-        plt.savefig('cluster_risk_scores.png')
-        plt.close()
+        record_plot('cluster_risk_scores.png', 'cluster_scatter',
+                    scores=np.asarray(movement_risk_scores), labels=np.asarray(cluster_labels),
+                    n_clusters=n_clusters, xlabel='Cluster', ylabel='Risk Score',
+                    title='Risk Scores by Movement Pattern Cluster')
     
     print("\nSurvey Data Analysis:")
     print(f"- Average risk score from surveys: {survey_risk_mean:.3f}")
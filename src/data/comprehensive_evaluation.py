@@ -3,12 +3,13 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
 from sklearn.linear_model import LogisticRegression
-import tensorflow as tf
 import warnings
+from landmark_store import landmark_dataset_exists, load_landmark_frame
+from metrics_engine import evaluate_scores, bootstrap_ci
+from tflite_model import load_pose_model
 warnings.filterwarnings('ignore')
 
 def load_and_analyze_data():
@@ -21,8 +22,8 @@ def load_and_analyze_data():
     
     # Load MediaPipe dataset
     mediapipe_path = os.path.join(current_dir, 'mediapipe_dataset.csv')
-    if os.path.exists(mediapipe_path):
-        mediapipe_df = pd.read_csv(mediapipe_path)
+    if landmark_dataset_exists(mediapipe_path):
+        mediapipe_df = load_landmark_frame(mediapipe_path)
         print(f"\nMediaPipe Dataset:")
         print(f"- Shape: {mediapipe_df.shape}")
         print(f"- Labels: {mediapipe_df['label'].value_counts().to_dict()}")
@@ -97,31 +98,51 @@ def evaluate_traditional_models(X, y):
         y_pred = model.predict(X_test_scaled)
         y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
         
-        # Calculate metrics
-        accuracy = accuracy_score(y_test, y_pred)
-        precision = precision_score(y_test, y_pred, zero_division=0)
-        recall = recall_score(y_test, y_pred, zero_division=0)
-        f1 = f1_score(y_test, y_pred, zero_division=0)
-        
         # Cross-validation
         cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5, scoring='accuracy')
         
         results[name] = {
-            'accuracy': accuracy,
-            'precision': precision,
-            'recall': recall,
-            'f1': f1,
             'cv_mean': cv_scores.mean(),
             'cv_std': cv_scores.std(),
             'predictions': y_pred,
             'probabilities': y_pred_proba
         }
+    
+    # Calculate metrics for all models at once from their stacked
+    # predictions and probabilities, sorting each row only once
+    names = list(results)
+    label_metrics = evaluate_scores(y_test, np.vstack([results[name]['predictions'] for name in names]), curves=False)
+    score_metrics = evaluate_scores(y_test, np.vstack([results[name]['probabilities'] for name in names]))
+    # Paired bootstrap intervals: every model is scored on the same resamples
+    intervals = bootstrap_ci(y_test, np.vstack([results[name]['probabilities'] for name in names]))
+    
+    for name, label_result, score_result, interval in zip(names, label_metrics, score_metrics, intervals):
+        accuracy = label_result['accuracy'][0]
+        precision = label_result['precision'][0]
+        recall = label_result['recall'][0]
+        f1 = label_result['f1'][0]
+        results[name].update({
+            'accuracy': accuracy,
+            'precision': precision,
+            'recall': recall,
+            'f1': f1,
+            'roc_auc': score_result['roc_auc'],
+            'average_precision': score_result['average_precision'],
+            'roc_auc_ci': (interval['roc_auc']['lower'], interval['roc_auc']['upper']),
+            'average_precision_ci': (interval['average_precision']['lower'], interval['average_precision']['upper']),
+            'report': label_result['report']
+        })
         
+        print(f"\n{name}:")
         print(f"  Accuracy: {accuracy:.4f} ({accuracy*100:.2f}%)")
         print(f"  Precision: {precision:.4f}")
         print(f"  Recall: {recall:.4f}")
         print(f"  F1-Score: {f1:.4f}")
-        print(f"  CV Accuracy: {cv_scores.mean():.4f} (+/- {cv_scores.std()*2:.4f})")
+        print(f"  ROC AUC: {score_result['roc_auc']:.4f} "
+              f"(95% CI {interval['roc_auc']['lower']:.4f}-{interval['roc_auc']['upper']:.4f})")
+        print(f"  Average Precision: {score_result['average_precision']:.4f} "
+              f"(95% CI {interval['average_precision']['lower']:.4f}-{interval['average_precision']['upper']:.4f})")
+        print(f"  CV Accuracy: {results[name]['cv_mean']:.4f} (+/- {results[name]['cv_std']*2:.4f})")
     
     return results
 
@@ -144,7 +165,8 @@ def evaluate_neural_network(X, y):
     model_path = os.path.join(current_dir, '..', 'models', 'best_pose_model.h5')
     
     try:
-        model = tf.keras.models.load_model(model_path)
+        # Keras by default; POSE_MODEL_BACKEND=float16 or int8 serves the TFLite exports
+        model = load_pose_model(keras_model_path=model_path)
         print("Loaded trained neural network model")
         
         # Make predictions
@@ -157,22 +179,30 @@ def evaluate_neural_network(X, y):
         y_pred = (y_pred_proba > 0.5).astype(int)
         
         # Calculate metrics
-        accuracy = accuracy_score(y_test, y_pred)
-        precision = precision_score(y_test, y_pred, zero_division=0)
-        recall = recall_score(y_test, y_pred, zero_division=0)
-        f1 = f1_score(y_test, y_pred, zero_division=0)
+        metrics = evaluate_scores(y_test, np.ravel(y_pred_proba), thresholds=0.5, strict=True)
+        accuracy = metrics['accuracy'][0]
+        precision = metrics['precision'][0]
+        recall = metrics['recall'][0]
+        f1 = metrics['f1'][0]
+        interval = bootstrap_ci(y_test, np.ravel(y_pred_proba))
         
         print(f"Neural Network Results:")
         print(f"  Accuracy: {accuracy:.4f} ({accuracy*100:.2f}%)")
         print(f"  Precision: {precision:.4f}")
         print(f"  Recall: {recall:.4f}")
         print(f"  F1-Score: {f1:.4f}")
+        print(f"  ROC AUC: {metrics['roc_auc']:.4f} "
+              f"(95% CI {interval['roc_auc']['lower']:.4f}-{interval['roc_auc']['upper']:.4f})")
         
         return {
             'accuracy': accuracy,
             'precision': precision,
             'recall': recall,
             'f1': f1,
+            'roc_auc': metrics['roc_auc'],
+            'average_precision': metrics['average_precision'],
+            'roc_auc_ci': (interval['roc_auc']['lower'], interval['roc_auc']['upper']),
+            'average_precision_ci': (interval['average_precision']['lower'], interval['average_precision']['upper']),
             'predictions': y_pred,
             'probabilities': y_pred_proba
         }
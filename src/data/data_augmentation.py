@@ -1,8 +1,8 @@
 import os
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
 import warnings
+from landmark_store import landmark_dataset_exists, load_landmark_frame
 warnings.filterwarnings('ignore')
 
 def augment_mediapipe_data():
@@ -14,12 +14,12 @@ def augment_mediapipe_data():
     print("DATA AUGMENTATION FOR MEDIAPIPE DATASET")
     print("="*60)
     
-    if not os.path.exists(mediapipe_path):
+    if not landmark_dataset_exists(mediapipe_path):
         print("❌ MediaPipe dataset not found!")
         return None
     
     # Load original dataset
-    df = pd.read_csv(mediapipe_path)
+    df = load_landmark_frame(mediapipe_path)
     original_size = len(df)
     
     print(f"📊 Original dataset size: {original_size}")
@@ -89,12 +89,12 @@ def create_synthetic_injury_data():
     print("⚠️  WARNING: This is for testing only!")
     print("   Real injury data should be collected for production use.")
     
-    if not os.path.exists(mediapipe_path):
+    if not landmark_dataset_exists(mediapipe_path):
         print("❌ MediaPipe dataset not found!")
         return None
     
     # Load original dataset
-    df = pd.read_csv(mediapipe_path)
+    df = load_landmark_frame(mediapipe_path)
     feature_cols = [col for col in df.columns if col != 'label']
     
     # Create synthetic injury data by modifying healthy data
@@ -164,8 +164,8 @@ def create_balanced_dataset():
     
     datasets = {}
     
-    if os.path.exists(original_path):
-        datasets['original'] = pd.read_csv(original_path)
+    if landmark_dataset_exists(original_path):
+        datasets['original'] = load_landmark_frame(original_path)
         print(f"📊 Original dataset: {len(datasets['original'])} samples")
     
     if os.path.exists(augmented_path):
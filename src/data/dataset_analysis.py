@@ -1,10 +1,9 @@
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from collections import Counter
 import warnings
+from landmark_store import landmark_dataset_exists, load_landmark_frame
 warnings.filterwarnings('ignore')
 
 def analyze_mediapipe_dataset():
@@ -16,12 +15,12 @@ def analyze_mediapipe_dataset():
     print("MEDIAPIPE DATASET ANALYSIS")
     print("="*60)
     
-    if not os.path.exists(mediapipe_path):
+    if not landmark_dataset_exists(mediapipe_path):
         print("❌ MediaPipe dataset not found!")
         return None
     
     # Load dataset
-    df = pd.read_csv(mediapipe_path)
+    df = load_landmark_frame(mediapipe_path)
     
     print(f"📊 Dataset Overview:")
     print(f"   - Shape: {df.shape}")
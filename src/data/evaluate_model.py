@@ -4,27 +4,41 @@ import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import roc_curve, auc, confusion_matrix, classification_report
-import matplotlib.pyplot as plt
-import seaborn as sns
-import tensorflow as tf
+from landmark_store import available_splits, load_landmark_frame
+from metrics_engine import bootstrap_ci
+from report_artifacts import record_plot
+from tflite_model import load_pose_model
 
 def load_and_preprocess_data():
     current_dir = os.path.dirname(os.path.abspath(__file__))
     
     # Load MediaPipe dataset
     mediapipe_path = os.path.join(current_dir, 'mediapipe_dataset.csv')
-    mediapipe_df = pd.read_csv(mediapipe_path)
-    
-    # Process MediaPipe data
-    # Keep only the landmark coordinates and visibility scores
-    X = mediapipe_df.drop(['label'], axis=1)
-    
-    # Create labels based on the movement type
-    # Assuming higher risk movements are: smash, jump_smash
-    y = (mediapipe_df['label'].isin(['smash', 'jump_smash'])).astype(int)
-    
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    splits = available_splits(mediapipe_path)
+    
+    if 'train' in splits and 'test' in splits:
+        # Use the Roboflow train/test splits extracted by process_mediapipe_dataset.py
+        train_df = load_landmark_frame(mediapipe_path, split='train')
+        test_df = load_landmark_frame(mediapipe_path, split='test')
+        X_train = train_df.drop(['label'], axis=1)
+        X_test = test_df.drop(['label'], axis=1)
+        
+        # Assuming higher risk movements are: smash, jump_smash
+        y_train = (train_df['label'].isin(['smash', 'jump_smash'])).astype(int)
+        y_test = (test_df['label'].isin(['smash', 'jump_smash'])).astype(int)
+    else:
+        mediapipe_df = load_landmark_frame(mediapipe_path)
+        
+        # Process MediaPipe data
+        # Keep only the landmark coordinates and visibility scores
+        X = mediapipe_df.drop(['label'], axis=1)
+        
+        # Create labels based on the movement type
+        # Assuming higher risk movements are: smash, jump_smash
+        y = (mediapipe_df['label'].isin(['smash', 'jump_smash'])).astype(int)
+        
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     # Scale features
     scaler = StandardScaler()
@@ -37,35 +51,18 @@ def plot_roc_curve(y_true, y_pred_proba):
     fpr, tpr, _ = roc_curve(y_true, y_pred_proba)
     roc_auc = auc(fpr, tpr)
     
-    plt.figure()
-    plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC curve (AUC = {roc_auc:.2f})')
-    plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
-    plt.xlim([0.0, 1.0])
-    plt.ylim([0.0, 1.05])
-    plt.xlabel('False Positive Rate')
-    plt.ylabel('True Positive Rate')
-    plt.title('Receiver Operating Characteristic (ROC) Curve')
-    plt.legend(loc="lower right")
-    
-    # Save the plot
+    # Save the plot (drawn in the background)
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    plt.savefig(os.path.join(current_dir, 'roc_curve.png'))
-    plt.close()
+    record_plot(os.path.join(current_dir, 'roc_curve.png'), 'roc_curve', fpr=fpr, tpr=tpr, roc_auc=roc_auc)
     
     return roc_auc
 
 def plot_confusion_matrix(y_true, y_pred):
     cm = confusion_matrix(y_true, y_pred)
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-    plt.title('Confusion Matrix')
-    plt.ylabel('True Label')
-    plt.xlabel('Predicted Label')
     
-    # Save the plot
+    # Save the plot (drawn in the background)
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    plt.savefig(os.path.join(current_dir, 'confusion_matrix.png'))
-    plt.close()
+    record_plot(os.path.join(current_dir, 'confusion_matrix.png'), 'confusion_matrix', matrix=cm)
 
 def evaluate_model():
     print("Loading and preprocessing data...")
@@ -74,7 +71,8 @@ def evaluate_model():
     print("Loading model...")
     current_dir = os.path.dirname(os.path.abspath(__file__))
     model_path = os.path.join(current_dir, '..', 'models', 'best_pose_model.h5')
-    model = tf.keras.models.load_model(model_path)
+    # Keras by default; POSE_MODEL_BACKEND=float16 or int8 serves the TFLite exports
+    model = load_pose_model(keras_model_path=model_path)
     
     print("Making predictions...")
     y_pred_proba = model.predict(X_test_scaled)
@@ -84,7 +82,10 @@ def evaluate_model():
     
     print("\nCalculating ROC curve and AUC...")
     roc_auc = plot_roc_curve(y_test, y_pred_proba)
-    print(f"ROC AUC: {roc_auc:.4f}")
+    interval = bootstrap_ci(y_test, y_pred_proba)
+    print(f"ROC AUC: {roc_auc:.4f} (95% CI {interval['roc_auc']['lower']:.4f}-{interval['roc_auc']['upper']:.4f})")
+    print(f"Average precision: {interval['average_precision']['estimate']:.4f} "
+          f"(95% CI {interval['average_precision']['lower']:.4f}-{interval['average_precision']['upper']:.4f})")
     
     print("\nGenerating confusion matrix...")
     plot_confusion_matrix(y_test, y_pred)
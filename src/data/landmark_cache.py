@@ -0,0 +1,81 @@
+import os
+import json
+import sqlite3
+import hashlib
+import numpy as np
+
+class LandmarkCache:
+    """
+    Persistent on-disk cache of extracted pose landmarks
+
+    Entries are keyed by the SHA-256 of the image bytes together with the
+    Pose settings used for inference, so renamed or copied images are still
+    hits while edited images and changed settings are misses. Images with no
+    detected pose are cached too, so they are not re-inferred on every run.
+    """
+    def __init__(self, cache_path, pose_settings):
+        self.cache_path = cache_path
+        self.settings_key = json.dumps(pose_settings, sort_keys=True)
+        self.conn = sqlite3.connect(cache_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS landmarks ('
+            'digest TEXT, settings TEXT, pose_data BLOB, '
+            'PRIMARY KEY (digest, settings))'
+        )
+        self.conn.commit()
+
+    def image_digest(self, image_path):
+        """Return the content hash of an image, reusing it while the file is unchanged"""
+        stat = os.stat(image_path)
+        path = os.path.abspath(image_path)
+        row = self.conn.execute(
+            'SELECT size, mtime_ns, digest FROM files WHERE path = ?', (path,)
+        ).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        sha = hashlib.sha256()
+        with open(image_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+
+        self.conn.execute(
+            'INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)',
+            (path, stat.st_size, stat.st_mtime_ns, digest)
+        )
+        return digest
+
+    def lookup(self, digest):
+        """Return (hit, pose_data); pose_data is None for cached non-detections"""
+        row = self.conn.execute(
+            'SELECT pose_data FROM landmarks WHERE digest = ? AND settings = ?',
+            (digest, self.settings_key)
+        ).fetchone()
+        if row is None:
+            return False, None
+        if row[0] is None:
+            return True, None
+        # Landmarks come from MediaPipe as float32, so this round-trip is exact
+        return True, np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def store(self, digest, pose_data):
+        """Record the extraction result for an image"""
+        blob = None if pose_data is None else np.asarray(pose_data, dtype=np.float32).tobytes()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO landmarks (digest, settings, pose_data) VALUES (?, ?, ?)',
+            (digest, self.settings_key, blob)
+        )
+
+    def commit(self):
+        """Flush stored results so an interrupted run can resume from here"""
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
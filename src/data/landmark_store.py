@@ -0,0 +1,339 @@
+import os
+import csv
+import glob
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+# Version of the on-disk layout written by LandmarkStoreWriter
+STORE_FORMAT_VERSION = 1
+
+# Number of landmarks and values per landmark (x, y, z, visibility)
+NUM_LANDMARKS = 33
+VALUES_PER_LANDMARK = 4
+
+LANDMARKS_FILE = 'landmarks.f32'
+LABELS_FILE = 'labels.i16'
+META_FILE = 'meta.json'
+MANIFEST_FILE = 'manifest.csv'
+
+# Split loaded by default: mediapipe_dataset.csv has always held the train
+# images only, so callers that re-split it never see valid or test images
+TRAIN_SPLIT = 'train'
+
+# One row per source image in a sharded dataset's manifest
+MANIFEST_COLUMNS = ['source_file', 'split', 'label', 'detected', 'shard', 'row', 'elapsed_ms', 'cached']
+
+def landmark_columns(num_landmarks=NUM_LANDMARKS):
+    """Column names for flattened landmarks (x, y, z, visibility per landmark)"""
+    columns = []
+    for j in range(num_landmarks):
+        columns.extend([
+            f'landmark_{j}_x',
+            f'landmark_{j}_y',
+            f'landmark_{j}_z',
+            f'landmark_{j}_visibility'
+        ])
+    return columns
+
+def store_path_for(csv_path):
+    """Binary store that sits next to (and replaces) a landmark CSV"""
+    return os.path.splitext(csv_path)[0] + '.landmarks'
+
+def shards_path_for(csv_path):
+    """Sharded multi-split dataset that sits next to (and replaces) a landmark CSV"""
+    return os.path.splitext(csv_path)[0] + '.shards'
+
+def _publish_directory(staging_path, path):
+    """Swap a fully written staging directory into place"""
+    if os.path.exists(path):
+        old_path = path + '.old'
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path)
+        os.replace(path, old_path)
+        os.replace(staging_path, path)
+        shutil.rmtree(old_path)
+    else:
+        os.replace(staging_path, path)
+
+class LandmarkStoreWriter:
+    """
+    Streams landmark rows into a binary landmark store
+
+    A store is a directory holding raw float32 landmarks shaped
+    (N, 33, 4), int16 label codes and a small JSON header with the label
+    vocabulary. Rows are appended to a staging directory that replaces the
+    destination on close(), so readers never see a half-written store.
+    """
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self.staging_path = store_path + '.partial'
+        if os.path.exists(self.staging_path):
+            shutil.rmtree(self.staging_path)
+        os.makedirs(self.staging_path)
+        self.landmarks_file = open(os.path.join(self.staging_path, LANDMARKS_FILE), 'wb')
+        self.labels_file = open(os.path.join(self.staging_path, LABELS_FILE), 'wb')
+        self.label_codes = {}
+        self.count = 0
+
+    def append(self, pose_data, label):
+        """Append one flattened (132 values) landmark row and its label"""
+        self.append_many(np.asarray(pose_data, dtype=np.float32).reshape(1, -1), [label])
+
+    def append_many(self, pose_data, labels):
+        """Append a block of flattened landmark rows and their labels"""
+        pose_data = np.ascontiguousarray(pose_data, dtype=np.float32)
+        if pose_data.shape[1] != NUM_LANDMARKS * VALUES_PER_LANDMARK:
+            raise ValueError(f"Expected {NUM_LANDMARKS * VALUES_PER_LANDMARK} values per row, got {pose_data.shape[1]}")
+        codes = np.array([self.label_codes.setdefault(label, len(self.label_codes)) for label in labels],
+                         dtype=np.int16)
+        self.landmarks_file.write(pose_data.tobytes())
+        self.labels_file.write(codes.tobytes())
+        self.count += len(codes)
+
+    def close(self):
+        """Write the header and publish the store"""
+        self.landmarks_file.close()
+        self.labels_file.close()
+        label_names = sorted(self.label_codes, key=self.label_codes.get)
+        with open(os.path.join(self.staging_path, META_FILE), 'w') as f:
+            json.dump({
+                'format_version': STORE_FORMAT_VERSION,
+                'num_samples': self.count,
+                'num_landmarks': NUM_LANDMARKS,
+                'values_per_landmark': VALUES_PER_LANDMARK,
+                'label_names': label_names
+            }, f, indent=2)
+
+        _publish_directory(self.staging_path, self.store_path)
+
+    def discard(self):
+        """Abandon the rows written so far"""
+        self.landmarks_file.close()
+        self.labels_file.close()
+        shutil.rmtree(self.staging_path)
+
+class ShardedLandmarkWriter:
+    """
+    Writes a multi-split dataset as landmark store shards plus a manifest
+
+    Each split gets its own shards, named <split>-<index>.landmarks; a new
+    shard is started every shard_size samples (or never, if shard_size is
+    None). manifest.csv records every source image, including those with no
+    detected pose, along with where its row landed and how long it took.
+    """
+    def __init__(self, shards_path, shard_size=None):
+        self.shards_path = shards_path
+        self.staging_path = shards_path + '.partial'
+        self.shard_size = shard_size
+        if os.path.exists(self.staging_path):
+            shutil.rmtree(self.staging_path)
+        os.makedirs(self.staging_path)
+        self.manifest_file = open(os.path.join(self.staging_path, MANIFEST_FILE), 'w', newline='')
+        self.manifest = csv.writer(self.manifest_file)
+        self.manifest.writerow(MANIFEST_COLUMNS)
+        self.writers = {}
+        self.shard_counts = {}
+        self.count = 0
+
+    def _writer_for(self, split):
+        """Current shard writer for a split, rolling over when it is full"""
+        writer = self.writers.get(split)
+        if writer is not None and self.shard_size and writer.count >= self.shard_size:
+            writer.close()
+            writer = None
+        if writer is None:
+            index = self.shard_counts.get(split, 0)
+            self.shard_counts[split] = index + 1
+            writer = LandmarkStoreWriter(os.path.join(self.staging_path, f'{split}-{index:05d}.landmarks'))
+            self.writers[split] = writer
+        return writer
+
+    def add(self, source_file, split, label, pose_data, elapsed=None, cached=False):
+        """Record one source image and, if it has a pose and label, its landmark row"""
+        shard, row = '', ''
+        detected = pose_data is not None
+        if detected and label is not None:
+            writer = self._writer_for(split)
+            shard = os.path.basename(writer.store_path)
+            row = writer.count
+            writer.append(pose_data, label)
+            self.count += 1
+        elapsed_ms = '' if elapsed is None else round(elapsed * 1000, 3)
+        self.manifest.writerow([source_file, split, label, int(detected), shard, row, elapsed_ms, int(cached)])
+
+    def close(self):
+        """Finish every shard and publish the dataset"""
+        for writer in self.writers.values():
+            writer.close()
+        self.manifest_file.close()
+        _publish_directory(self.staging_path, self.shards_path)
+
+    def discard(self):
+        """Abandon everything written so far"""
+        for writer in self.writers.values():
+            writer.discard()
+        self.manifest_file.close()
+        shutil.rmtree(self.staging_path)
+
+class LandmarkStore:
+    """
+    Read-only, memory-mapped view of a binary landmark store
+
+    Nothing is parsed on open; pages of the landmark array are only read
+    from disk when they are touched.
+    """
+    def __init__(self, store_path):
+        self.store_path = store_path
+        with open(os.path.join(store_path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta['format_version'] > STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported landmark store version: {self.meta['format_version']}")
+
+        shape = (self.meta['num_samples'], self.meta['num_landmarks'], self.meta['values_per_landmark'])
+        self.label_names = self.meta['label_names']
+        if shape[0] == 0:
+            self.landmarks = np.zeros(shape, dtype=np.float32)
+            self.label_codes = np.zeros(0, dtype=np.int16)
+        else:
+            self.landmarks = np.memmap(os.path.join(store_path, LANDMARKS_FILE),
+                                       dtype=np.float32, mode='r', shape=shape)
+            self.label_codes = np.memmap(os.path.join(store_path, LABELS_FILE),
+                                         dtype=np.int16, mode='r', shape=(shape[0],))
+
+    def __len__(self):
+        return self.landmarks.shape[0]
+
+    @property
+    def labels(self):
+        """Decoded label for every sample"""
+        return np.asarray(self.label_names, dtype=object)[self.label_codes]
+
+    def features(self, include_visibility=True):
+        """Flattened (N, 132) landmarks, or (N, 99) without visibility"""
+        if include_visibility:
+            return self.landmarks.reshape(len(self), -1)
+        return self.landmarks[:, :, :3].reshape(len(self), -1)
+
+    def to_frame(self):
+        """DataFrame with the same columns as mediapipe_dataset.csv"""
+        df = pd.DataFrame(self.features(), columns=landmark_columns(self.landmarks.shape[1]), copy=False)
+        df['label'] = self.labels
+        return df
+
+def open_landmark_store(path):
+    """Open a landmark store given its directory or the CSV it replaces"""
+    if path.endswith('.csv'):
+        path = store_path_for(path)
+    return LandmarkStore(path)
+
+def _is_current(meta_path, csv_path):
+    """True if meta_path exists and is at least as new as the CSV"""
+    if not os.path.exists(meta_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(meta_path) >= os.path.getmtime(csv_path)
+
+def has_current_store(csv_path):
+    """True if a binary store exists and is at least as new as the CSV"""
+    return _is_current(os.path.join(store_path_for(csv_path), META_FILE), csv_path)
+
+def has_current_shards(csv_path):
+    """True if a sharded dataset exists and is at least as new as the CSV"""
+    return _is_current(os.path.join(shards_path_for(csv_path), MANIFEST_FILE), csv_path)
+
+def landmark_dataset_exists(path):
+    """True if the landmark dataset exists as a CSV, a binary store or shards"""
+    return (os.path.exists(path)
+            or os.path.exists(os.path.join(store_path_for(path), META_FILE))
+            or os.path.exists(os.path.join(shards_path_for(path), MANIFEST_FILE)))
+
+def _shard_stores(shards_path, split=None):
+    """Open the shards of one split (or of every split) in order"""
+    pattern = '*.landmarks' if split is None else f'{split}-*.landmarks'
+    return [LandmarkStore(p) for p in sorted(glob.glob(os.path.join(shards_path, pattern)))]
+
+def available_splits(path):
+    """Splits present in the sharded dataset for path, or [] if it is not sharded"""
+    shards_path = path if os.path.isdir(path) else shards_path_for(path)
+    if not os.path.isdir(path) and not has_current_shards(path):
+        return []
+    names = [os.path.basename(p) for p in glob.glob(os.path.join(shards_path, '*.landmarks'))]
+    return sorted({name.rsplit('-', 1)[0] for name in names})
+
+def load_manifest(path):
+    """Manifest of a sharded dataset, given its directory or the CSV it replaces"""
+    shards_path = path if os.path.isdir(path) else shards_path_for(path)
+    return pd.read_csv(os.path.join(shards_path, MANIFEST_FILE), keep_default_na=False)
+
+def load_landmark_arrays(path, split=TRAIN_SPLIT):
+    """
+    Load the landmark dataset as ((N, 33, 4) float32 landmarks, labels)
+
+    path may be a CSV, a binary store, or a sharded dataset directory. For a
+    CSV, a sharded dataset or binary store next to it is used instead when
+    it is at least as new. split selects one split of a sharded dataset
+    (the train split by default); pass split=None for every split. A CSV or
+    binary store holds the train split only.
+    """
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE)):
+        stores = [LandmarkStore(path)]
+    elif os.path.isdir(path):
+        stores = _shard_stores(path, split)
+    elif has_current_shards(path):
+        stores = _shard_stores(shards_path_for(path), split)
+    elif split not in (None, TRAIN_SPLIT):
+        raise ValueError(f"Split '{split}' requested but {path} has no sharded dataset")
+    elif has_current_store(path):
+        stores = [open_landmark_store(path)]
+    else:
+        df = pd.read_csv(path)
+        landmarks = df[landmark_columns()].to_numpy(dtype=np.float32).reshape(len(df), NUM_LANDMARKS, VALUES_PER_LANDMARK)
+        return landmarks, df['label'].to_numpy(dtype=object)
+
+    if not stores:
+        return np.zeros((0, NUM_LANDMARKS, VALUES_PER_LANDMARK), dtype=np.float32), np.zeros(0, dtype=object)
+    if len(stores) == 1:
+        # Single shard: stay memory-mapped
+        return stores[0].landmarks, stores[0].labels
+    return (np.concatenate([store.landmarks for store in stores]),
+            np.concatenate([store.labels for store in stores]))
+
+def load_landmark_frame(path, split=TRAIN_SPLIT):
+    """
+    Load the MediaPipe landmark dataset as a DataFrame
+
+    Uses the memory-mapped binary store or sharded dataset when one is
+    available and falls back to parsing the CSV otherwise, so callers can
+    keep passing the mediapipe_dataset.csv path. split is as for
+    load_landmark_arrays.
+    """
+    if split in (None, TRAIN_SPLIT) and not os.path.isdir(path) and not has_current_shards(path) and not has_current_store(path):
+        return pd.read_csv(path)
+    landmarks, labels = load_landmark_arrays(path, split)
+    df = pd.DataFrame(landmarks.reshape(len(landmarks), -1),
+                      columns=landmark_columns(landmarks.shape[1]), copy=False)
+    df['label'] = labels
+    return df
+
+def convert_csv_to_store(csv_path, store_path=None, chunksize=10000):
+    """Convert a landmark CSV into a binary store, one chunk at a time"""
+    if store_path is None:
+        store_path = store_path_for(csv_path)
+    writer = LandmarkStoreWriter(store_path)
+    try:
+        columns = landmark_columns()
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            writer.append_many(chunk[columns].to_numpy(dtype=np.float32), chunk['label'].tolist())
+    except Exception:
+        writer.discard()
+        raise
+    writer.close()
+    print(f"Converted {writer.count} samples from {csv_path} to {store_path}")
+    return store_path
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    convert_csv_to_store(os.path.join(current_dir, 'mediapipe_dataset.csv'))
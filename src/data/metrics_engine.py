@@ -0,0 +1,339 @@
+import os
+import multiprocessing
+import numpy as np
+
+# np.trapz was renamed np.trapezoid in NumPy 2.0
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+# Resampled indices held in memory at once per bootstrap chunk; a chunk is
+# this many elements divided by the number of samples
+BOOTSTRAP_CHUNK_ELEMENTS = 4_000_000
+
+# Rank layouts shared with bootstrap pool workers by the initializer
+_worker_layouts = None
+
+def _as_matrix(scores):
+    """View scores as (models, samples); a single score vector is one model"""
+    scores = np.asarray(scores, dtype=np.float64)
+    return scores[np.newaxis] if scores.ndim == 1 else scores
+
+def _ranked_counts(y_true, scores):
+    """
+    Sort every row of scores once (descending) and accumulate the labels
+
+    Returns (sorted_scores, cumulative_true_positives), both (models,
+    samples). Everything else is derived from these two arrays.
+    """
+    order = np.argsort(-scores, axis=1, kind='mergesort')
+    sorted_scores = np.take_along_axis(scores, order, axis=1)
+    cum_tps = np.cumsum(y_true[order], axis=1)
+    return sorted_scores, cum_tps
+
+def _curve_points(sorted_scores, cum_tps):
+    """Counts at each distinct threshold, as in sklearn's binary curve helper"""
+    distinct = np.where(np.diff(sorted_scores))[0]
+    threshold_idxs = np.r_[distinct, len(sorted_scores) - 1]
+    tps = cum_tps[threshold_idxs].astype(np.float64)
+    fps = 1 + threshold_idxs - tps
+    return fps, tps, sorted_scores[threshold_idxs]
+
+def _roc(fps, tps, thresholds):
+    """ROC curve with sklearn's drop_intermediate=True, and its area"""
+    if len(fps) > 2:
+        keep = np.where(np.r_[True, np.logical_or(np.diff(fps, 2), np.diff(tps, 2)), True])[0]
+        fps, tps, thresholds = fps[keep], tps[keep], thresholds[keep]
+    fps = np.r_[0.0, fps]
+    tps = np.r_[0.0, tps]
+    thresholds = np.r_[np.inf, thresholds]
+    fpr = fps / fps[-1] if fps[-1] > 0 else np.full(fps.shape, np.nan)
+    tpr = tps / tps[-1] if tps[-1] > 0 else np.full(tps.shape, np.nan)
+    return fpr, tpr, thresholds, float(_trapezoid(tpr, fpr))
+
+def _precision_recall(fps, tps, thresholds):
+    """PR curve in sklearn's order (recall decreasing) and average precision"""
+    predicted = tps + fps
+    precision = np.divide(tps, predicted, out=np.zeros_like(tps), where=predicted != 0)
+    recall = tps / tps[-1] if tps[-1] > 0 else np.ones_like(tps)
+    precision = np.r_[precision[::-1], 1.0]
+    recall = np.r_[recall[::-1], 0.0]
+    average_precision = max(0.0, float(-np.sum(np.diff(recall) * precision[:-1])))
+    return precision, recall, thresholds[::-1], average_precision
+
+def _confusion_at(sorted_scores, cum_tps, positives, thresholds, strict):
+    """
+    (len(thresholds), 2, 2) confusion matrices for one model
+
+    A sample is predicted positive when its score is >= threshold (or >
+    threshold if strict), so the number of predicted positives is one
+    binary search into the sorted scores.
+    """
+    ascending = sorted_scores[::-1]
+    side = 'right' if strict else 'left'
+    predicted = len(ascending) - np.searchsorted(ascending, thresholds, side=side)
+    tp = np.where(predicted > 0, cum_tps[np.maximum(predicted - 1, 0)], 0)
+    fp = predicted - tp
+    fn = positives - tp
+    tn = len(sorted_scores) - positives - fp
+    return np.stack([np.stack([tn, fp], axis=-1), np.stack([fn, tp], axis=-1)], axis=-2)
+
+def _safe_divide(numerator, denominator):
+    """Elementwise ratio that is 0 where the denominator is 0 (zero_division=0)"""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+def classification_report_from_confusion(confusion):
+    """
+    sklearn's classification_report(output_dict=True) for one 2x2 matrix
+
+    Uses zero_division=0; classes are keyed '0' and '1'.
+    """
+    (tn, fp), (fn, tp) = np.asarray(confusion, dtype=np.float64)
+    support = np.array([tn + fp, fn + tp])
+    precision = _safe_divide([tn, tp], [tn + fn, tp + fp])
+    recall = _safe_divide([tn, tp], support)
+    f1 = _safe_divide(2 * precision * recall, precision + recall)
+    total = support.sum()
+
+    report = {}
+    for label in (0, 1):
+        report[str(label)] = {
+            'precision': float(precision[label]),
+            'recall': float(recall[label]),
+            'f1-score': float(f1[label]),
+            'support': float(support[label])
+        }
+    report['accuracy'] = float((tn + tp) / total) if total else 0.0
+    report['macro avg'] = {
+        'precision': float(precision.mean()),
+        'recall': float(recall.mean()),
+        'f1-score': float(f1.mean()),
+        'support': float(total)
+    }
+    weights = support / total if total else np.zeros(2)
+    report['weighted avg'] = {
+        'precision': float(precision @ weights),
+        'recall': float(recall @ weights),
+        'f1-score': float(f1 @ weights),
+        'support': float(total)
+    }
+    return report
+
+def evaluate_scores(y_true, scores, thresholds=(0.5,), strict=False, curves=True):
+    """
+    Binary classification metrics for one or many models from a single sort
+
+    scores is a (samples,) vector or a (models, samples) matrix of scores
+    (probabilities, or hard 0/1 predictions). Each row is sorted once, and
+    ROC (fpr, tpr, roc_thresholds, roc_auc), precision-recall
+    (precision_curve, recall_curve, pr_thresholds, average_precision) and
+    the confusion matrix at every value of thresholds all come from that
+    one cumulative pass. The curves and areas match sklearn's roc_curve,
+    auc, precision_recall_curve and average_precision_score.
+
+    For each threshold, samples scoring >= threshold (> threshold if
+    strict) are predicted positive; accuracy, precision, recall and f1 are
+    arrays with one entry per threshold (zero_division=0), and report is
+    the classification report at the first threshold.
+
+    Returns a dict per model, or a list of them for a score matrix.
+    """
+    y_true = np.asarray(y_true).astype(np.int64).ravel()
+    matrix = _as_matrix(scores)
+    if matrix.shape[1] != len(y_true):
+        raise ValueError(f"scores have {matrix.shape[1]} samples but y_true has {len(y_true)}")
+    thresholds = np.atleast_1d(np.asarray(thresholds, dtype=np.float64))
+    positives = int(y_true.sum())
+
+    sorted_scores, cum_tps = _ranked_counts(y_true, matrix)
+    results = []
+    for row in range(len(matrix)):
+        confusion = _confusion_at(sorted_scores[row], cum_tps[row], positives, thresholds, strict)
+        tn, fp = confusion[:, 0, 0], confusion[:, 0, 1]
+        fn, tp = confusion[:, 1, 0], confusion[:, 1, 1]
+        precision = _safe_divide(tp, tp + fp)
+        recall = _safe_divide(tp, tp + fn)
+        result = {
+            'thresholds': thresholds,
+            'confusion': confusion,
+            'accuracy': (tp + tn) / len(y_true),
+            'precision': precision,
+            'recall': recall,
+            'f1': _safe_divide(2 * precision * recall, precision + recall),
+            'report': classification_report_from_confusion(confusion[0])
+        }
+
+        if curves:
+            fps, tps, curve_thresholds = _curve_points(sorted_scores[row], cum_tps[row])
+            result['fpr'], result['tpr'], result['roc_thresholds'], result['roc_auc'] = _roc(fps, tps, curve_thresholds)
+            (result['precision_curve'], result['recall_curve'],
+             result['pr_thresholds'], result['average_precision']) = _precision_recall(fps, tps, curve_thresholds)
+        results.append(result)
+
+    return results[0] if np.asarray(scores).ndim == 1 else results
+
+def _rank_layout(y_true, scores):
+    """
+    Precompute where each sample lands in a count vector ordered by score
+
+    Positives and negatives sharing a score form one bin, and bins are
+    numbered highest score first: positive bins occupy slots [0, P) and
+    negative bins [P, P + N). Returns (slots, P, positives_before,
+    negatives_through, tied_negatives, tied_positives), where for each
+    negative bin positives_before counts the positive bins strictly above
+    it, for each positive bin negatives_through counts the negative bins
+    at or above it, and the tied arrays pair up bins with the same score.
+    """
+    _, group = np.unique(-scores, return_inverse=True)
+    group = group.ravel()
+    positive_groups = np.unique(group[y_true == 1])
+    negative_groups = np.unique(group[y_true == 0])
+    slots = np.where(
+        y_true == 1,
+        np.searchsorted(positive_groups, group),
+        len(positive_groups) + np.searchsorted(negative_groups, group)
+    )
+    positives_before = np.searchsorted(positive_groups, negative_groups, side='left')
+    negatives_through = np.searchsorted(negative_groups, positive_groups, side='right')
+    tied = np.intersect1d(positive_groups, negative_groups)
+    tied_positives = np.searchsorted(positive_groups, tied)
+    tied_negatives = np.searchsorted(negative_groups, tied)
+    return slots, len(positive_groups), positives_before, negatives_through, tied_negatives, tied_positives
+
+def _areas_from_counts(counts, layout):
+    """
+    ROC AUC and average precision for each row of (resamples, bins) counts
+
+    Ties count half in the AUC, matching sklearn's trapezoidal area, and
+    average precision steps at every distinct score as
+    average_precision_score does. Rows with no positives (or no negatives,
+    for AUC) are NaN.
+    """
+    _, n_positive_bins, positives_before, negatives_through, tied_negatives, tied_positives = layout
+    positives = counts[:, :n_positive_bins]
+    negatives = counts[:, n_positive_bins:]
+    # Running totals behind a leading zero column, so "nothing above" indexes as 0
+    tps = np.zeros((len(counts), positives.shape[1] + 1), dtype=np.int64)
+    fps = np.zeros((len(counts), negatives.shape[1] + 1), dtype=np.int64)
+    np.cumsum(positives, axis=1, out=tps[:, 1:])
+    np.cumsum(negatives, axis=1, out=fps[:, 1:])
+    total_positive = tps[:, -1]
+    total_negative = fps[:, -1]
+
+    ranked_pairs = np.einsum('ij,ij->i', negatives, tps[:, positives_before], dtype=np.float64)
+    ranked_pairs += 0.5 * np.einsum('ij,ij->i', negatives[:, tied_negatives], positives[:, tied_positives],
+                                    dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        roc_auc = ranked_pairs / (total_positive.astype(np.float64) * total_negative)
+        predicted = tps[:, 1:] + fps[:, negatives_through]
+        precision = np.divide(tps[:, 1:], predicted, out=np.zeros(predicted.shape), where=predicted > 0)
+        average_precision = np.einsum('ij,ij->i', positives, precision) / total_positive
+    roc_auc[(total_positive == 0) | (total_negative == 0)] = np.nan
+    average_precision[total_positive == 0] = np.nan
+    return roc_auc, average_precision
+
+def _bootstrap_areas(layouts, seed, n_resamples):
+    """
+    AUC and AP of every model on n_resamples bootstrap resamples
+
+    Resamples are drawn as an (n_resamples, samples) index matrix, shared
+    by all models so their intervals are paired. Mapping indices through a
+    model's slots, offset by resample, and counting them in one flat
+    bincount gives every resample's binned counts directly, with no sorting
+    and no per-resample Python loop.
+    """
+    n_samples = len(layouts[0][0])
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, n_samples, size=(n_resamples, n_samples))
+    roc_auc = np.empty((len(layouts), n_resamples))
+    average_precision = np.empty((len(layouts), n_resamples))
+    for row, layout in enumerate(layouts):
+        slots = layout[0]
+        n_bins = len(layout[2]) + layout[1]
+        flat_slots = np.arange(n_resamples)[:, np.newaxis] * n_bins + slots[indices]
+        counts = np.bincount(flat_slots.ravel(), minlength=n_resamples * n_bins).reshape(n_resamples, n_bins)
+        roc_auc[row], average_precision[row] = _areas_from_counts(counts, layout)
+    return roc_auc, average_precision
+
+def _init_bootstrap_worker(layouts):
+    """
+    Keep the rank layouts in a pool worker for its whole life
+    """
+    global _worker_layouts
+    _worker_layouts = layouts
+
+def _bootstrap_in_worker(task):
+    seed, n_resamples = task
+    return _bootstrap_areas(_worker_layouts, seed, n_resamples)
+
+def bootstrap_ci(y_true, scores, n_resamples=10000, confidence=0.95, seed=42, num_workers=None,
+                 chunk_size=None):
+    """
+    Percentile bootstrap confidence intervals for ROC AUC and average precision
+
+    scores is a (samples,) vector or a (models, samples) matrix; every
+    model is evaluated on the same resamples. Scores are ranked once up
+    front into bins of tied scores, after which each resample is just an
+    index draw and a bincount, so thousands of resamples stay cheap.
+
+    Resamples are split into chunks of chunk_size (by default sized from
+    BOOTSTRAP_CHUNK_ELEMENTS) and spread over num_workers processes
+    (default: one per core). Each chunk gets its own child of
+    np.random.SeedSequence(seed), so results depend only on seed and
+    chunk_size, not on the number of workers.
+
+    Returns a dict per model, or a list of them for a score matrix, with
+    'roc_auc' and 'average_precision' entries holding the point estimate,
+    the interval bounds, the bootstrap standard error and how many
+    resamples were usable (resamples missing a class are skipped).
+    """
+    y_true = np.asarray(y_true).astype(np.int64).ravel()
+    matrix = _as_matrix(scores)
+    if matrix.shape[1] != len(y_true):
+        raise ValueError(f"scores have {matrix.shape[1]} samples but y_true has {len(y_true)}")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+
+    layouts = [_rank_layout(y_true, row) for row in matrix]
+    # The point estimate is the "resample" that takes every sample once
+    point_estimates = [
+        _areas_from_counts(np.bincount(layout[0], minlength=len(layout[2]) + layout[1])[np.newaxis], layout)
+        for layout in layouts
+    ]
+
+    if chunk_size is None:
+        chunk_size = max(1, BOOTSTRAP_CHUNK_ELEMENTS // max(1, len(y_true)))
+    sizes = [min(chunk_size, n_resamples - start) for start in range(0, n_resamples, chunk_size)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = min(num_workers, len(tasks))
+
+    if num_workers <= 1:
+        chunks = [_bootstrap_areas(layouts, *task) for task in tasks]
+    else:
+        with multiprocessing.Pool(
+            processes=num_workers,
+            initializer=_init_bootstrap_worker,
+            initargs=(layouts,)
+        ) as pool:
+            chunks = pool.map(_bootstrap_in_worker, tasks)
+
+    tail = 100 * (1 - confidence) / 2
+    results = []
+    for row in range(len(matrix)):
+        result = {'n_resamples': n_resamples, 'confidence': confidence, 'seed': seed}
+        for metric, index in (('roc_auc', 0), ('average_precision', 1)):
+            values = np.concatenate([chunk[index][row] for chunk in chunks])
+            values = values[~np.isnan(values)]
+            lower, upper = np.percentile(values, [tail, 100 - tail]) if len(values) else (np.nan, np.nan)
+            result[metric] = {
+                'estimate': float(point_estimates[row][index][0]),
+                'lower': float(lower),
+                'upper': float(upper),
+                'std_error': float(np.std(values, ddof=1)) if len(values) > 1 else np.nan,
+                'valid_resamples': int(len(values))
+            }
+        results.append(result)
+
+    return results[0] if np.asarray(scores).ndim == 1 else results
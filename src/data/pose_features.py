@@ -0,0 +1,60 @@
+import numpy as np
+
+# MediaPipe Pose landmark indices used by the advanced features
+LEFT_SHOULDER = 11
+LEFT_ELBOW = 13
+LEFT_WRIST = 15
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+# Columns produced by extract_advanced_features, in order
+ADVANCED_FEATURE_NAMES = [
+    'shoulder_angle', 'hip_angle', 'knee_angle', 'mean_velocity',
+    'hip_balance', 'ankle_balance', 'spine_alignment'
+]
+
+def landmarks_to_array(landmarks):
+    """Convert MediaPipe landmarks to a (33, 4) array of x, y, z, visibility"""
+    return np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in landmarks])
+
+def _joint_angles(a, b, c):
+    """Angle at b (in degrees, 0-180) for (N, 2) arrays of points a, b, c"""
+    radians = np.arctan2(c[:, 1]-b[:, 1], c[:, 0]-b[:, 0]) - np.arctan2(a[:, 1]-b[:, 1], a[:, 0]-b[:, 0])
+    angle = np.abs(radians*180.0/np.pi)
+    return np.where(angle > 180.0, 360-angle, angle)
+
+def extract_advanced_features_batch(landmarks):
+    """
+    Vectorised extract_advanced_features over many frames
+
+    Takes an (N, 33, 4) (or a single (33, 4)) landmark array and returns an
+    (N, 7) feature matrix with the columns in ADVANCED_FEATURE_NAMES. The
+    values match RealTimeRiskPredictor.extract_advanced_features frame by
+    frame.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    if landmarks.ndim == 2:
+        landmarks = landmarks[np.newaxis]
+    xy = landmarks[:, :, :2]
+    
+    # Key joint angles (the hip and knee angles both use hip-knee-ankle)
+    shoulder_angle = _joint_angles(xy[:, LEFT_SHOULDER], xy[:, LEFT_ELBOW], xy[:, LEFT_WRIST])
+    hip_angle = _joint_angles(xy[:, LEFT_HIP], xy[:, LEFT_KNEE], xy[:, LEFT_ANKLE])
+    
+    # Mean distance between consecutive landmark indices
+    steps = np.diff(xy, axis=1)
+    velocity = np.mean(np.sqrt(steps[:, :, 0]*steps[:, :, 0] + steps[:, :, 1]*steps[:, :, 1]), axis=1)
+    
+    # Balance and posture
+    y = landmarks[:, :, 1]
+    hip_balance = np.abs(y[:, LEFT_HIP] - y[:, RIGHT_HIP])
+    ankle_balance = np.abs(y[:, LEFT_ANKLE] - y[:, RIGHT_ANKLE])
+    spine_alignment = np.abs(y[:, LEFT_SHOULDER] - y[:, LEFT_HIP])
+    
+    return np.column_stack([
+        shoulder_angle, hip_angle, hip_angle, velocity,
+        hip_balance, ankle_balance, spine_alignment
+    ])
@@ -0,0 +1,150 @@
+import numpy as np
+from landmark_store import NUM_LANDMARKS, VALUES_PER_LANDMARK
+from pose_features import LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE, _joint_angles
+
+# Joint angles tracked over time, as (a, b, c) landmark triples with the
+# angle measured at b. Names shared with pose_features measure the same
+# joints; the shoulder-hip-knee angle is trunk_hip_angle because the
+# model's hip_angle is taken at the knee (hip-knee-ankle)
+SESSION_ANGLES = {
+    'shoulder_angle': (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    'trunk_hip_angle': (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    'knee_angle': (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+}
+
+# Running sums are rebuilt from the buffers every this many windows so
+# floating-point drift cannot accumulate over long sessions
+RESUM_INTERVAL_WINDOWS = 64
+
+# Columns returned by AthleteSession.features, in order
+SESSION_FEATURE_NAMES = [
+    'mean_joint_speed', 'max_joint_speed', 'mean_joint_acceleration',
+    'wrist_speed', 'ankle_speed', 'rolling_mean_joint_speed'
+]
+for _name in SESSION_ANGLES:
+    SESSION_FEATURE_NAMES.extend([
+        _name, f'{_name}_rolling_mean', f'{_name}_rolling_std', f'{_name}_velocity'
+    ])
+
+class AthleteSession:
+    """
+    Temporal pose state for one athlete
+
+    Keeps the last window frames of (33, 4) landmarks in a fixed-size ring
+    buffer and updates motion features incrementally as frames arrive:
+    per-joint velocities and accelerations come from the previous frame and
+    velocity, and rolling angle and speed statistics are maintained as
+    running sums that add the new frame and subtract the one leaving the
+    window. Each update is O(1) in the window length.
+
+    Timestamps are in seconds; without them frames are assumed to be
+    1 / fps apart (or one time unit apart if fps is not given either).
+    """
+    def __init__(self, athlete_id=None, window=30, fps=None):
+        if window < 2:
+            raise ValueError("window must be at least 2 frames")
+        self.athlete_id = athlete_id
+        self.window = window
+        self.fps = fps
+        self.frame_interval = 1.0 / fps if fps else 1.0
+        self.frames = np.zeros((window, NUM_LANDMARKS, VALUES_PER_LANDMARK))
+        self.timestamps = np.zeros(window)
+        self.frame_count = 0
+
+        angle_count = len(SESSION_ANGLES)
+        self._angle_triples = np.array(list(SESSION_ANGLES.values()))
+        self._angles = np.zeros((window, angle_count))
+        self._mean_speeds = np.zeros(window)
+        self._angle_sum = np.zeros(angle_count)
+        self._angle_sq_sum = np.zeros(angle_count)
+        self._speed_sum = 0.0
+
+        self.velocity = np.zeros((NUM_LANDMARKS, 2))
+        self.acceleration = np.zeros((NUM_LANDMARKS, 2))
+        self.angle_velocity = np.zeros(angle_count)
+        self._latest = None
+
+    def __len__(self):
+        """Number of frames currently held in the window"""
+        return min(self.frame_count, self.window)
+
+    def update(self, landmarks, timestamp=None):
+        """
+        Add a (33, 4) landmark frame and return the updated features
+
+        Returns the same array as features().
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float64).reshape(NUM_LANDMARKS, VALUES_PER_LANDMARK)
+        slot = self.frame_count % self.window
+        previous = (self.frame_count - 1) % self.window
+
+        if timestamp is None:
+            timestamp = self.timestamps[previous] + self.frame_interval if self.frame_count else 0.0
+        xy = landmarks[:, :2]
+        angles = _joint_angles(xy[self._angle_triples[:, 0]], xy[self._angle_triples[:, 1]],
+                               xy[self._angle_triples[:, 2]])
+
+        # Motion relative to the previous frame
+        if self.frame_count:
+            dt = timestamp - self.timestamps[previous]
+            if dt <= 0:
+                dt = self.frame_interval
+            velocity = (xy - self.frames[previous, :, :2]) / dt
+            self.acceleration = (velocity - self.velocity) / dt if self.frame_count > 1 else np.zeros_like(velocity)
+            self.angle_velocity = (angles - self._angles[previous]) / dt
+            self.velocity = velocity
+        speeds = np.sqrt(np.sum(self.velocity ** 2, axis=1))
+        mean_speed = np.mean(speeds)
+
+        # Slide the running sums: drop the frame being overwritten, add this one
+        if self.frame_count >= self.window:
+            self._angle_sum -= self._angles[slot]
+            self._angle_sq_sum -= self._angles[slot] ** 2
+            self._speed_sum -= self._mean_speeds[slot]
+        self._angle_sum += angles
+        self._angle_sq_sum += angles ** 2
+        self._speed_sum += mean_speed
+
+        self.frames[slot] = landmarks
+        self.timestamps[slot] = timestamp
+        self._angles[slot] = angles
+        self._mean_speeds[slot] = mean_speed
+        self.frame_count += 1
+        if self.frame_count % (self.window * RESUM_INTERVAL_WINDOWS) == 0:
+            self._angle_sum = np.sum(self._angles, axis=0)
+            self._angle_sq_sum = np.sum(self._angles ** 2, axis=0)
+            self._speed_sum = float(np.sum(self._mean_speeds))
+
+        n = len(self)
+        angle_mean = self._angle_sum / n
+        angle_std = np.sqrt(np.maximum(self._angle_sq_sum / n - angle_mean ** 2, 0))
+        accelerations = np.sqrt(np.sum(self.acceleration ** 2, axis=1))
+
+        features = [
+            mean_speed, np.max(speeds), np.mean(accelerations),
+            speeds[LEFT_WRIST], speeds[LEFT_ANKLE], self._speed_sum / n
+        ]
+        for i in range(len(SESSION_ANGLES)):
+            features.extend([angles[i], angle_mean[i], angle_std[i], self.angle_velocity[i]])
+        self._latest = np.array(features)
+        return self._latest
+
+    def features(self):
+        """Latest temporal features, in SESSION_FEATURE_NAMES order"""
+        if self._latest is None:
+            return np.zeros(len(SESSION_FEATURE_NAMES))
+        return self._latest
+
+    def feature_dict(self):
+        """Latest temporal features keyed by name"""
+        return dict(zip(SESSION_FEATURE_NAMES, self.features().tolist()))
+
+    def recent_frames(self):
+        """Frames in the window, oldest first, as an (n, 33, 4) array"""
+        n = len(self)
+        order = (self.frame_count - n + np.arange(n)) % self.window
+        return self.frames[order]
+
+    def reset(self):
+        """Forget all history, e.g. between rallies"""
+        self.__init__(self.athlete_id, self.window, self.fps)
@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+import numpy as np
+from process_mediapipe_dataset import create_pose, infer_pose_landmarks
+
+class PosePool:
+    """
+    Bounded, lazily filled pool of MediaPipe Pose graphs
+
+    A Pose graph is not safe to use from two threads at once, and building
+    one is expensive. The pool creates graphs on demand up to max_size
+    (default: one per core), hands each to one thread at a time and takes
+    it back afterwards. When every graph is busy, acquire() waits for one to
+    be returned instead of building another.
+
+    Graphs handed out are interchangeable, so the default settings are
+    still-image mode. A camera that wants tracking mode should acquire a
+    graph once and keep it for the life of its stream.
+    """
+    def __init__(self, max_size=None, pose_settings=None):
+        self.max_size = max_size or os.cpu_count() or 1
+        self.pose_settings = pose_settings
+        self.created = 0
+        # Most recently returned graph first, so a small working set stays warm
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self, timeout=None):
+        """Take a graph, creating one if under max_size; raises TimeoutError if none frees up"""
+        if self._closed:
+            raise RuntimeError("PosePool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self.created < self.max_size
+            if create:
+                self.created += 1
+        if create:
+            try:
+                return create_pose(self.pose_settings)
+            except Exception:
+                with self._lock:
+                    self.created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No Pose graph became free within {timeout}s")
+
+    def release(self, pose):
+        """Return a graph taken with acquire()"""
+        if self._closed:
+            pose.close()
+        else:
+            self._idle.put(pose)
+
+    @contextmanager
+    def pose(self, timeout=None):
+        """Borrow a graph for the duration of a with block"""
+        pose = self.acquire(timeout)
+        try:
+            yield pose
+        finally:
+            self.release(pose)
+
+    def close(self):
+        """Close idle graphs now and any borrowed ones as they come back"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class PredictorPool:
+    """
+    Share one fitted RealTimeRiskPredictor across worker threads
+
+    snapshot() hands out a read-only RiskSnapshot of the predictor's current
+    cluster table. Snapshots are cached and only rebuilt after the predictor
+    publishes a new table, so threads share the same model arrays rather
+    than copying them. Pose graphs come from a PosePool. Together these let
+    camera threads or threaded web handlers score concurrently without a
+    global lock or building anything per request.
+    """
+    def __init__(self, predictor, max_poses=None, pose_settings=None):
+        self.predictor = predictor
+        self.poses = PosePool(max_poses, pose_settings)
+        # (table, snapshot) pair, swapped as one object so readers never see a mismatch
+        self._current = (None, None)
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """Read-only snapshot of the predictor's current model"""
+        table, snapshot = self._current
+        if snapshot is not None and table is self.predictor.cluster_table:
+            return snapshot
+        with self._lock:
+            table, snapshot = self._current
+            if snapshot is None or table is not self.predictor.cluster_table:
+                snapshot = self.predictor.snapshot()
+                self._current = (snapshot.table, snapshot)
+            return snapshot
+
+    def pose(self, timeout=None):
+        """Borrow a Pose graph (use as a context manager)"""
+        return self.poses.pose(timeout)
+
+    def score_image(self, image_rgb, timeout=None):
+        """
+        Run Pose on an RGB image and score it
+
+        Returns the prediction dict, or None if no pose was detected.
+        """
+        with self.poses.pose(timeout) as pose:
+            pose_data = infer_pose_landmarks(image_rgb, pose)
+        if pose_data is None:
+            return None
+        # Scoring uses x, y, z of every landmark, as in training
+        features = np.asarray(pose_data, dtype=np.float64).reshape(-1, 4)[:, :3].reshape(1, -1)
+        return self.snapshot().predict_risk(features)
+
+    def close(self):
+        self.poses.close()
@@ -1,53 +1,338 @@
 import os
-import cv2
-import mediapipe as mp
+import csv
+import queue
+import threading
+import multiprocessing
+from collections import deque
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
 import time
+from landmark_cache import LandmarkCache
+from landmark_store import TRAIN_SPLIT, ShardedLandmarkWriter, landmark_columns, shards_path_for
 
-def extract_pose_landmarks(image_path):
+# Settings used for every Pose graph built for still-image extraction
+POSE_SETTINGS = {
+    'static_image_mode': True,
+    'model_complexity': 2,
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5
+}
+
+# Speed/accuracy trade-offs for extraction: the Pose model tier and the
+# longest image side (in pixels) to downscale to before inference. Landmarks
+# are normalised to the image size, so downscaling does not change their units.
+EXTRACTION_PROFILES = {
+    'fast': {'model_complexity': 0, 'max_side': 320},
+    'balanced': {'model_complexity': 1, 'max_side': 480},
+    'accurate': {'model_complexity': 2, 'max_side': None}
+}
+DEFAULT_PROFILE = 'accurate'
+
+# Roboflow export splits, each in its own directory next to this script
+DATASET_SPLITS = ('train', 'valid', 'test')
+
+# Pose graph owned by a pool worker for its whole lifetime, and the
+# downscale limit it applies
+_worker_pose = None
+_worker_max_side = None
+
+# Marks the end of a pipeline stage's output
+_END_OF_STREAM = object()
+
+def create_pose(pose_settings=None):
     """
-    Extract pose landmarks from an image using MediaPipe
+    Create a MediaPipe Pose graph for still-image extraction
+    """
+    import mediapipe as mp
+    settings = dict(POSE_SETTINGS)
+    if pose_settings:
+        settings.update(pose_settings)
+    return mp.solutions.pose.Pose(**settings)
+
+def profile_settings(profile=DEFAULT_PROFILE):
+    """
+    Return (pose_settings, max_side) for a named extraction profile
+    """
+    if profile not in EXTRACTION_PROFILES:
+        raise ValueError(f"Unknown extraction profile '{profile}'. Choose from: {', '.join(EXTRACTION_PROFILES)}")
+    config = EXTRACTION_PROFILES[profile]
+    return {'model_complexity': config['model_complexity']}, config['max_side']
+
+def profile_cache_settings(profile=DEFAULT_PROFILE):
+    """
+    Settings that identify a profile's results in the landmark cache
+    """
+    pose_settings, max_side = profile_settings(profile)
+    settings = dict(POSE_SETTINGS, **pose_settings)
+    if max_side is not None:
+        settings['max_side'] = max_side
+    return settings
+
+def downscale_image(image, max_side=None):
+    """
+    Shrink an image so its longest side is at most max_side, keeping the
+    aspect ratio; smaller images and max_side=None leave it unchanged
+    """
+    if max_side is not None:
+        height, width = image.shape[:2]
+        scale = max_side / max(height, width)
+        if scale < 1:
+            import cv2
+            image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+    return image
+
+def load_image_rgb(image_path, max_side=None):
+    """
+    Read an image from disk and convert it to RGB
+
+    If max_side is set, images whose longest side exceeds it are
+    downscaled (keeping the aspect ratio) before inference.
+    """
+    import cv2
+    image = cv2.imread(image_path)
+    if image is None:
+        print(f"Failed to read image: {image_path}")
+        return None
+
+    image = downscale_image(image, max_side)
+
+    # Convert BGR to RGB
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def _infer_pose(image_rgb, pose, image_path=''):
+    """
+    Run a Pose graph on an image; returns (pose_data, failed)
+
+    pose_data is None both when no pose is detected and when inference
+    fails; failed tells the two apart, so only a real "no pose" result is
+    worth caching.
     """
     try:
-        # Initialize MediaPipe Pose
-        mp_pose = mp.solutions.pose
-        pose = mp_pose.Pose(
-            static_image_mode=True,
-            model_complexity=2,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        
-        # Read and process the image
-        image = cv2.imread(image_path)
-        if image is None:
-            print(f"Failed to read image: {image_path}")
-            return None
-        
-        # Convert BGR to RGB
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        
         # Process the image
         results = pose.process(image_rgb)
-        
+
         if not results.pose_landmarks:
             print(f"No pose landmarks detected in: {image_path}")
-            return None
-        
+            return None, False
+
         # Extract landmarks
         landmarks = results.pose_landmarks.landmark
-        
+
         # Convert landmarks to a flat list of coordinates
         pose_data = []
         for landmark in landmarks:
             pose_data.extend([landmark.x, landmark.y, landmark.z, landmark.visibility])
-        
-        return pose_data
+
+        return pose_data, False
     except Exception as e:
         print(f"Error processing {image_path}: {str(e)}")
-        return None
+        return None, True
+
+def infer_pose_landmarks(image_rgb, pose, image_path=''):
+    """
+    Run a Pose graph on a decoded RGB image and flatten the landmarks
+    """
+    return _infer_pose(image_rgb, pose, image_path)[0]
+
+def _extract_pose(image_path, pose=None, max_side=None):
+    """
+    Read an image and run a Pose graph on it; returns (pose_data, failed)
+    """
+    owns_pose = pose is None
+    try:
+        # Initialize MediaPipe Pose
+        if owns_pose:
+            pose = create_pose()
+
+        # Read and process the image
+        image_rgb = load_image_rgb(image_path, max_side)
+        if image_rgb is None:
+            return None, True
+
+        return _infer_pose(image_rgb, pose, image_path)
+    except Exception as e:
+        print(f"Error processing {image_path}: {str(e)}")
+        return None, True
+    finally:
+        if owns_pose and pose is not None:
+            pose.close()
+
+def extract_pose_landmarks(image_path, pose=None, max_side=None):
+    """
+    Extract pose landmarks from an image using MediaPipe
+
+    Pass an existing Pose graph to reuse it across images; otherwise a
+    graph is built for this single call. max_side optionally downscales the
+    image first.
+    """
+    return _extract_pose(image_path, pose, max_side)[0]
+
+class RateLimiter:
+    """
+    Spaces out calls so that at most max_per_second happen each second
+
+    A limit of None disables rate limiting.
+    """
+    def __init__(self, max_per_second=None):
+        self.interval = 1.0 / max_per_second if max_per_second else 0.0
+        self.next_time = time.monotonic()
+
+    def wait(self):
+        """Block until the next call is allowed"""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_time > now:
+            time.sleep(self.next_time - now)
+            now = self.next_time
+        self.next_time = now + self.interval
+
+def _put_until_stopped(out_queue, item, stop_event):
+    """
+    Put an item on a bounded queue, giving up once the consumer has stopped
+    """
+    while not stop_event.is_set():
+        try:
+            out_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _decode_stage(image_paths, out_queue, rate_limiter, stop_event, max_side=None):
+    """
+    Decoding stage: read and convert images ahead of inference
+    """
+    try:
+        for image_path in image_paths:
+            rate_limiter.wait()
+            start_time = time.perf_counter()
+            try:
+                image_rgb = load_image_rgb(image_path, max_side)
+            except Exception as e:
+                # Reported as "no pose" like any other unreadable image
+                print(f"Error processing {image_path}: {str(e)}")
+                image_rgb = None
+            item = (image_path, image_rgb, time.perf_counter() - start_time)
+            if not _put_until_stopped(out_queue, item, stop_event):
+                return
+    finally:
+        # Always end the stream, or the consumer would wait forever
+        _put_until_stopped(out_queue, _END_OF_STREAM, stop_event)
+
+def _init_extraction_worker(pose_settings, max_side):
+    """
+    Build the Pose graph a pool worker keeps alive for its whole life
+    """
+    global _worker_pose, _worker_max_side
+    _worker_pose = create_pose(pose_settings)
+    _worker_max_side = max_side
+
+def _extract_in_worker(image_path):
+    """
+    Extract landmarks in a pool worker using its long-lived Pose graph
+    """
+    start_time = time.perf_counter()
+    pose_data, failed = _extract_pose(image_path, pose=_worker_pose, max_side=_worker_max_side)
+    return image_path, pose_data, time.perf_counter() - start_time, failed
+
+def extract_landmarks_parallel(image_paths, num_workers=None, profile=DEFAULT_PROFILE,
+                               max_in_flight=16, max_images_per_second=None):
+    """
+    Extract pose landmarks for many images using a pool of worker processes
+
+    Each worker builds one Pose graph when it starts and pulls image paths
+    from the pool's shared task queue. Results are yielded as
+    (image_path, pose_data, elapsed_seconds, failed) tuples in the same
+    order as image_paths, so the output does not depend on worker
+    scheduling. failed is True when the image could not be read or
+    inference raised, as opposed to no pose being detected.
+
+    At most max_in_flight images are decoded or being inferred at once, so
+    memory stays flat however many images there are. max_images_per_second
+    optionally caps throughput (e.g. to respect a thermal limit). profile
+    names an entry of EXTRACTION_PROFILES.
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    pose_settings, max_side = profile_settings(profile)
+    rate_limiter = RateLimiter(max_images_per_second)
+
+    if num_workers <= 1:
+        # Serial mode: decode on a background thread while this one infers,
+        # reusing a single graph for every image
+        decoded = queue.Queue(maxsize=max_in_flight)
+        stop_event = threading.Event()
+        decoder = threading.Thread(
+            target=_decode_stage,
+            args=(image_paths, decoded, rate_limiter, stop_event, max_side),
+            daemon=True
+        )
+        pose = create_pose(pose_settings)
+        decoder.start()
+        try:
+            while True:
+                item = decoded.get()
+                if item is _END_OF_STREAM:
+                    break
+                image_path, image_rgb, elapsed = item
+                # The decoder passes None for images it could not read
+                pose_data, failed = None, True
+                if image_rgb is not None:
+                    start_time = time.perf_counter()
+                    pose_data, failed = _infer_pose(image_rgb, pose, image_path)
+                    elapsed += time.perf_counter() - start_time
+                yield image_path, pose_data, elapsed, failed
+        finally:
+            stop_event.set()
+            decoder.join()
+            pose.close()
+        return
+
+    with multiprocessing.Pool(
+        processes=num_workers,
+        initializer=_init_extraction_worker,
+        initargs=(pose_settings, max_side)
+    ) as pool:
+        # Keep a bounded window of submitted images and yield them in order
+        pending = deque()
+        for image_path in image_paths:
+            rate_limiter.wait()
+            pending.append(pool.apply_async(_extract_in_worker, (image_path,)))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+def _write_stage(shard_writer, csv_path, row_queue, errors):
+    """
+    Writer stage: append finished rows and manifest entries to disk as they arrive
+    """
+    csv_file = None
+    try:
+        if csv_path:
+            csv_file = open(csv_path, 'w', newline='')
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(landmark_columns() + ['label'])
+        while True:
+            row = row_queue.get()
+            if row is _END_OF_STREAM:
+                break
+            source_file, split, label, pose_data, elapsed, cached = row
+            shard_writer.add(source_file, split, label, pose_data, elapsed, cached)
+            # The CSV keeps its original train-only contents
+            if csv_file is not None and split == TRAIN_SPLIT and pose_data is not None and label is not None:
+                csv_writer.writerow(list(pose_data) + [label])
+    except Exception as e:
+        errors.append(e)
+        # Keep draining so the producer never blocks on a dead writer
+        while row_queue.get() is not _END_OF_STREAM:
+            pass
+    finally:
+        if csv_file is not None:
+            csv_file.close()
 
 def get_label_from_filename(filename):
     """
@@ -57,80 +342,198 @@ def get_label_from_filename(filename):
         # Remove file extension and Roboflow suffix
         base_name = os.path.splitext(filename)[0]
         base_name = base_name.split('_rf.')[0]
-        
+
         # Extract the main label (e.g., 'smash', 'serve-backhand', etc.)
         label = base_name.split('-')[0]
-        
+
         return label
     except Exception as e:
         print(f"Error extracting label from {filename}: {str(e)}")
         return None
 
-def process_dataset(batch_size=50):
-    """
-    Process all images in the dataset and create a CSV file
-    """
-    # Path to the dataset
-    dataset_path = os.path.join(os.path.dirname(__file__), 'train')
-    
-    # Initialize lists to store data
-    pose_data_list = []
-    labels = []
-    
-    # Get all image files
-    image_files = [f for f in os.listdir(dataset_path) if f.endswith(('.jpg', '.jpeg', '.png'))]
-    total_files = len(image_files)
-    
+def process_dataset(batch_size=50, num_workers=1, cache_path=None, max_images_per_second=None,
+                    export_csv=False, splits=DATASET_SPLITS, shard_size=None, profile=DEFAULT_PROFILE):
+    """
+    Process all images in the dataset splits in a single pass
+
+    Every split directory (train, valid and test by default) is read by one
+    extraction run. Images flow through a bounded decode -> infer -> write
+    pipeline and rows are appended as soon as they are ready to
+    mediapipe_dataset.shards (see landmark_store.py): one landmark store
+    shard per split, or per shard_size samples, plus manifest.csv recording
+    each image's source file, label, split, detection result and timing.
+    Memory use does not grow with the number of images. Set export_csv to
+    also write every detected train row to mediapipe_dataset.csv.
+
+    num_workers controls how many extraction processes are used; pass None
+    to use every available core. Landmarks are cached in cache_path
+    (landmark_cache.sqlite next to this script by default), so re-runs only
+    infer new or changed images and interrupted runs resume where they
+    stopped. Pass cache_path=False to disable the cache. The cache is
+    committed every batch_size images. max_images_per_second optionally
+    rate-limits inference. profile picks the speed/accuracy trade-off from
+    EXTRACTION_PROFILES.
+    """
+    data_dir = os.path.dirname(os.path.abspath(__file__))
+    if cache_path is None:
+        cache_path = os.path.join(data_dir, 'landmark_cache.sqlite')
+    csv_output_path = os.path.join(data_dir, 'mediapipe_dataset.csv')
+    output_path = shards_path_for(csv_output_path)
+    partial_csv_path = csv_output_path + '.partial' if export_csv else None
+
+    # Get all image files of every split in a stable order
+    image_entries = []
+    for split in splits:
+        dataset_path = os.path.join(data_dir, split)
+        if not os.path.isdir(dataset_path):
+            print(f"Skipping missing split: {split}")
+            continue
+        split_files = sorted(f for f in os.listdir(dataset_path) if f.endswith(('.jpg', '.jpeg', '.png')))
+        print(f"Found {len(split_files)} images in {split}")
+        image_entries.extend((split, f) for f in split_files)
+    total_files = len(image_entries)
+
     print(f"Found {total_files} images to process")
-    
-    # Process images in batches
-    for i in range(0, total_files, batch_size):
-        batch_files = image_files[i:i + batch_size]
-        
-        # Process each image in the batch
-        for image_file in tqdm(batch_files, desc=f"Processing batch {i//batch_size + 1}"):
-            image_path = os.path.join(dataset_path, image_file)
-            
-            # Extract pose landmarks
-            pose_data = extract_pose_landmarks(image_path)
-            
-            if pose_data is not None:
-                # Get label from filename
-                label = get_label_from_filename(image_file)
-                
-                if label is not None:
-                    # Add to lists
-                    pose_data_list.append(pose_data)
-                    labels.append(label)
-        
-        # Add a small delay between batches to prevent overheating
-        time.sleep(1)
-
-    # Save results after all batches are processed
-    if pose_data_list:
-        # Create column names for the DataFrame
-        columns = []
-        for j in range(len(pose_data_list[0]) // 4):  # 4 values per landmark (x, y, z, visibility)
-            columns.extend([
-                f'landmark_{j}_x',
-                f'landmark_{j}_y',
-                f'landmark_{j}_z',
-                f'landmark_{j}_visibility'
-            ])
-        
-        # Create DataFrame
-        df = pd.DataFrame(pose_data_list, columns=columns)
-        df['label'] = labels
-        
-        # Save to CSV
-        output_path = os.path.join(os.path.dirname(__file__), 'mediapipe_dataset.csv')
-        df.to_csv(output_path, index=False)
-        
-        print(f"\nProcessing complete!")
-        print(f"Total samples processed: {len(df)}")
-        print(f"Dataset saved to: {output_path}")
-    else:
+
+    image_paths = [os.path.join(data_dir, split, f) for split, f in image_entries]
+
+    # Look up previously extracted landmarks
+    cache = LandmarkCache(cache_path, profile_cache_settings(profile)) if cache_path else None
+    digests = [None] * total_files
+    cached = set()
+    if cache is not None:
+        for idx, image_path in enumerate(image_paths):
+            digests[idx] = cache.image_digest(image_path)
+            if cache.lookup(digests[idx])[0]:
+                cached.add(idx)
+        cache.commit()
+        print(f"Reusing cached landmarks for {len(cached)} images")
+
+    # Extract landmarks for the remaining images, keeping one Pose graph per worker
+    pending_paths = [p for idx, p in enumerate(image_paths) if idx not in cached]
+    results = extract_landmarks_parallel(
+        pending_paths,
+        num_workers=num_workers,
+        profile=profile,
+        max_images_per_second=max_images_per_second
+    )
+
+    # Start the writer stage
+    shard_writer = ShardedLandmarkWriter(output_path, shard_size=shard_size)
+    row_queue = queue.Queue(maxsize=max(batch_size, 1))
+    writer_errors = []
+    writer = threading.Thread(
+        target=_write_stage,
+        args=(shard_writer, partial_csv_path, row_queue, writer_errors),
+        daemon=True
+    )
+    writer.start()
+
+    num_samples = 0
+    try:
+        for idx, (split, image_file) in enumerate(tqdm(image_entries, desc="Processing images")):
+            elapsed = None
+            if idx in cached:
+                pose_data = cache.lookup(digests[idx])[1]
+            else:
+                # Extract pose landmarks
+                _, pose_data, elapsed, failed = next(results)
+                # Unreadable images and inference errors are retried on the
+                # next run instead of being cached as "no pose"
+                if cache is not None and not failed:
+                    cache.store(digests[idx], pose_data)
+
+            # Get label from filename
+            label = get_label_from_filename(image_file)
+            if pose_data is not None and label is not None:
+                num_samples += 1
+
+            row_queue.put((f'{split}/{image_file}', split, label, pose_data, elapsed, idx in cached))
+
+            # Persist progress so an interrupted run resumes from here
+            if cache is not None and (idx + 1) % batch_size == 0:
+                cache.commit()
+    finally:
+        # Shut down the worker pool and the writer
+        results.close()
+        row_queue.put(_END_OF_STREAM)
+        writer.join()
+        if cache is not None:
+            cache.close()
+
+    if writer_errors or not num_samples:
+        shard_writer.discard()
+        if partial_csv_path and os.path.exists(partial_csv_path):
+            os.remove(partial_csv_path)
+        if writer_errors:
+            raise writer_errors[0]
         print("No valid pose data was extracted from the images.")
+        return
+
+    # Only replace the previous dataset once every row is on disk
+    shard_writer.close()
+    if partial_csv_path:
+        os.replace(partial_csv_path, csv_output_path)
+
+    print(f"\nProcessing complete!")
+    print(f"Total samples processed: {num_samples}")
+    print(f"Dataset saved to: {output_path}")
+    if partial_csv_path:
+        print(f"CSV export saved to: {csv_output_path}")
+
+def benchmark_profiles(image_paths, profiles=None, reference_profile=DEFAULT_PROFILE):
+    """
+    Compare extraction profiles on a sample of images
+
+    Reports images/sec for each profile, its detection rate, and how far
+    its landmarks deviate from the reference profile (complexity 2 at full
+    resolution by default). Deviation is the mean Euclidean distance between
+    matching normalised (x, y) landmarks over images both profiles detect.
+    """
+    if profiles is None:
+        profiles = list(EXTRACTION_PROFILES)
+    run_order = [reference_profile] + [p for p in profiles if p != reference_profile]
+
+    outputs = {}
+    throughput = {}
+    for profile in run_order:
+        pose_settings, max_side = profile_settings(profile)
+        pose = create_pose(pose_settings)
+        try:
+            start_time = time.perf_counter()
+            outputs[profile] = [extract_pose_landmarks(path, pose=pose, max_side=max_side) for path in image_paths]
+            elapsed = time.perf_counter() - start_time
+        finally:
+            pose.close()
+        throughput[profile] = len(image_paths) / elapsed if elapsed > 0 else float('inf')
+
+    report = []
+    reference = outputs[reference_profile]
+    for profile in run_order:
+        if profile not in profiles:
+            continue
+        detected = [data is not None for data in outputs[profile]]
+        deviations = []
+        for ref_data, data in zip(reference, outputs[profile]):
+            if ref_data is None or data is None:
+                continue
+            ref_xy = np.asarray(ref_data).reshape(-1, 4)[:, :2]
+            xy = np.asarray(data).reshape(-1, 4)[:, :2]
+            deviations.append(np.mean(np.linalg.norm(xy - ref_xy, axis=1)))
+        report.append({
+            'profile': profile,
+            'model_complexity': EXTRACTION_PROFILES[profile]['model_complexity'],
+            'max_side': EXTRACTION_PROFILES[profile]['max_side'],
+            'images_per_sec': throughput[profile],
+            'detection_rate': np.mean(detected) if detected else 0.0,
+            'mean_landmark_deviation': np.mean(deviations) if deviations else np.nan,
+            'max_landmark_deviation': np.max(deviations) if deviations else np.nan
+        })
+
+    report = pd.DataFrame(report)
+    print(f"\nExtraction profile benchmark ({len(image_paths)} images, reference: {reference_profile}):")
+    print(report.to_string(index=False))
+    return report
 
 if __name__ == "__main__":
-    process_dataset(batch_size=50) 
\ No newline at end of file
+    process_dataset(batch_size=50, num_workers=os.cpu_count())
@@ -0,0 +1,173 @@
+import random
+import numpy as np
+
+# Version of the array layout written by QuantileSketch.to_arrays
+SKETCH_FORMAT_VERSION = 1
+
+class QuantileSketch:
+    """
+    KLL streaming quantile sketch
+
+    Holds a stack of compactors: level h keeps items that each stand for
+    2^h inserted values. When the sketch outgrows its budget the lowest full
+    level is sorted and every other item (from a random offset) is promoted
+    to the level above, halving that level's size. Memory stays O(k) items
+    however many values are inserted, and the rank error of a quantile is
+    about 1.7 / k with high probability (roughly 1% at the default k=200).
+    While nothing has been compacted the sketch is exact and quantile()
+    matches np.percentile's linear interpolation.
+
+    Sketches built in different processes can be combined with merge(), and
+    to_arrays()/from_arrays() round-trip one through plain numpy arrays (for
+    example inside an .npz model file).
+    """
+    def __init__(self, k=200, seed=0):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.n = 0
+        self.levels = [[]]
+        self.min_value = np.inf
+        self.max_value = -np.inf
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level):
+        """Items level may hold: k at the top, shrinking by 2/3 per level below"""
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _size(self):
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def _compress(self):
+        """Compact full levels until the sketch fits its budget again"""
+        while self._size() > self._max_size():
+            for level, items in enumerate(self.levels):
+                if len(items) >= self._capacity(level):
+                    break
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            items.sort()
+            # An odd item out stays behind so total weight is preserved
+            keep = [items.pop()] if len(items) % 2 else []
+            offset = self._rng.randint(0, 1)
+            self.levels[level + 1].extend(items[offset::2])
+            self.levels[level] = keep
+
+    def update(self, value, weight=1):
+        """
+        Insert a value, optionally with an integer weight
+
+        A weight w is inserted as its binary decomposition (one item at
+        level h for every set bit 2^h), so inserting a value with weight w
+        is equivalent to inserting it w times. NaN and infinite values are
+        ignored, as in update_many.
+        """
+        weight = int(weight)
+        value = float(value)
+        if weight <= 0 or not np.isfinite(value):
+            return
+        level = 0
+        remaining = weight
+        while remaining:
+            if remaining & 1:
+                while level >= len(self.levels):
+                    self.levels.append([])
+                self.levels[level].append(value)
+            remaining >>= 1
+            level += 1
+        self.n += weight
+        self.min_value = min(self.min_value, value)
+        self.max_value = max(self.max_value, value)
+        self._compress()
+
+    def update_many(self, values):
+        """Insert every finite value of an array, compacting as the sketch fills"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        self.min_value = min(self.min_value, float(values.min()))
+        self.max_value = max(self.max_value, float(values.max()))
+        # Feed level 0 a level-0 capacity at a time so compaction keeps up
+        step = max(1, self._capacity(0))
+        for start in range(0, len(values), step):
+            self.levels[0].extend(values[start:start + step].tolist())
+            self.n += len(values[start:start + step])
+            self._compress()
+
+    def merge(self, other):
+        """Fold another sketch into this one; the other sketch is unchanged"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self.min_value = min(self.min_value, other.min_value)
+        self.max_value = max(self.max_value, other.max_value)
+        self._compress()
+        return self
+
+    def _weighted_items(self):
+        """Stored items sorted by value, with the weight each one carries"""
+        values = np.concatenate([np.asarray(items, dtype=np.float64) for items in self.levels])
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.int64)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def quantiles(self, qs):
+        """
+        Estimate several quantiles (each in [0, 1]) at once
+
+        Each stored item covers a run of ranks equal to its weight; the
+        value at fractional rank q * (n - 1) is linearly interpolated
+        between neighbouring ranks, as np.percentile does.
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        values, weights = self._weighted_items()
+        upper_ranks = np.cumsum(weights) - 1
+        total = upper_ranks[-1] + 1
+
+        positions = np.clip(qs, 0, 1) * (total - 1)
+        lower = np.floor(positions).astype(np.int64)
+        upper = np.minimum(lower + 1, total - 1)
+        lower_values = values[np.searchsorted(upper_ranks, lower)]
+        upper_values = values[np.searchsorted(upper_ranks, upper)]
+        result = lower_values + (positions - lower) * (upper_values - lower_values)
+        return np.clip(result, self.min_value, self.max_value)
+
+    def quantile(self, q):
+        """Estimate a single quantile (q in [0, 1])"""
+        return float(self.quantiles([q])[0])
+
+    def to_arrays(self, prefix='sketch_'):
+        """Serialise to a dict of numpy arrays, e.g. to pass to np.savez"""
+        return {
+            f'{prefix}format_version': np.array(SKETCH_FORMAT_VERSION),
+            f'{prefix}params': np.array([self.k, self.n], dtype=np.int64),
+            f'{prefix}range': np.array([self.min_value, self.max_value]),
+            f'{prefix}level_sizes': np.array([len(items) for items in self.levels], dtype=np.int64),
+            f'{prefix}items': np.concatenate([np.asarray(items, dtype=np.float64) for items in self.levels])
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix='sketch_', seed=0):
+        """Rebuild a sketch from the arrays written by to_arrays"""
+        version = int(arrays[f'{prefix}format_version'])
+        if version != SKETCH_FORMAT_VERSION:
+            raise ValueError(f"Unsupported quantile sketch format version {version} "
+                             f"(expected {SKETCH_FORMAT_VERSION})")
+        k, n = (int(v) for v in arrays[f'{prefix}params'])
+        sketch = cls(k=k, seed=seed)
+        sketch.n = n
+        sketch.min_value, sketch.max_value = (float(v) for v in arrays[f'{prefix}range'])
+        items = arrays[f'{prefix}items']
+        boundaries = np.cumsum(arrays[f'{prefix}level_sizes'])[:-1]
+        sketch.levels = [part.tolist() for part in np.split(items, boundaries)]
+        return sketch
@@ -1,34 +1,211 @@
 import os
+import csv
+import hashlib
+import threading
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import cross_val_score, KFold
-from sklearn.ensemble import RandomForestClassifier
-import tensorflow as tf
-from sklearn.metrics import roc_curve, auc, precision_recall_curve, average_precision_score
-import matplotlib.pyplot as plt
-import seaborn as sns
 import time
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
-import cv2
-import mediapipe as mp
-from datetime import datetime
+from collections import deque
+from landmark_store import landmark_columns, load_landmark_frame
+from cluster_metrics import DEFAULT_MEMORY_BUDGET_MB, mean_abs_pairwise_difference
+from cluster_selection import make_kmeans, select_cluster_count
+from process_mediapipe_dataset import create_pose, downscale_image
+from pose_features import ADVANCED_FEATURE_NAMES, extract_advanced_features_batch, landmarks_to_array
+from pose_session import AthleteSession
+from quantile_sketch import QuantileSketch
+from report_artifacts import record_plot
+
+# Pose settings for whole-video ingestion: tracking mode reuses the previous
+# frame's pose instead of re-detecting from scratch
+VIDEO_POSE_SETTINGS = {
+    'static_image_mode': False,
+    'model_complexity': 1
+}
+
+# Longest-side limits live mode steps through (from full resolution down)
+# when glass-to-risk latency runs over budget
+LIVE_MAX_SIDE_STEPS = [None, 640, 480, 320, 240]
+
+# Version of the fitted-state file written by RealTimeRiskPredictor.save
+MODEL_SCHEMA_VERSION = 1
+
+def _evaluate_fold(fold, X_scaled, movement_risk_scores, train_idx, val_idx, n_clusters,
+                   tolerance=0.1):
+    """Fit one CV fold and score its validation risk predictions"""
+    start_time = time.time()
+    kmeans = make_kmeans(n_clusters, len(train_idx))
+    kmeans.fit(X_scaled[train_idx])
+    val_clusters = kmeans.predict(X_scaled[val_idx])
+    
+    # Mean training risk per cluster in one grouped pass; empty clusters map to 0
+    sums = np.bincount(kmeans.labels_, weights=movement_risk_scores[train_idx], minlength=n_clusters)
+    counts = np.bincount(kmeans.labels_, minlength=n_clusters)
+    cluster_risk = np.divide(sums, counts, out=np.zeros(n_clusters), where=counts > 0)
+    
+    val_risk_scores = cluster_risk[val_clusters]
+    accuracy = np.mean(np.abs(val_risk_scores - movement_risk_scores[val_idx]) < tolerance)
+    
+    return {
+        'fold': fold,
+        'accuracy': float(accuracy),
+        'train_size': len(train_idx),
+        'val_size': len(val_idx),
+        'cluster_risk': cluster_risk,
+        'cluster_counts': counts,
+        'fit_seconds': time.time() - start_time
+    }
+
+def cross_validate_clusters(X_scaled, movement_risk_scores, n_clusters, n_splits=5, n_jobs=None):
+    """
+    Run the KMeans risk-mapping cross-validation with folds in parallel
+    
+    Returns a report dict with the per-fold results (in fold order) and the
+    mean and standard deviation of the fold accuracies.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import KFold
+    
+    movement_risk_scores = np.asarray(movement_risk_scores, dtype=np.float64)
+    kf = KFold(n_splits=n_splits, shuffle=True, random_state=42)
+    if n_jobs is None:
+        n_jobs = min(n_splits, os.cpu_count() or 1)
+    
+    folds = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate_fold)(fold, X_scaled, movement_risk_scores, train_idx, val_idx, n_clusters)
+        for fold, (train_idx, val_idx) in enumerate(kf.split(X_scaled), start=1)
+    )
+    
+    scores = np.array([result['accuracy'] for result in folds])
+    return {
+        'n_splits': n_splits,
+        'n_clusters': n_clusters,
+        'folds': folds,
+        'scores': scores,
+        'mean_accuracy': float(np.mean(scores)),
+        'std_accuracy': float(np.std(scores))
+    }
+
+def score_cluster_table(table, landmark_data):
+    """Score an (N, D) array of unscaled landmark features against a cluster table"""
+    # Nearest folded centroid in scaled space
+    z = np.asarray(landmark_data, dtype=np.float64) * table['inv_scale']
+    sq_distances = (np.sum(z ** 2, axis=1)[:, np.newaxis]
+                    - 2 * z @ table['folded_centers'].T
+                    + table['center_sq_norms'])
+    clusters = np.argmin(sq_distances, axis=1)
+    distance = np.sqrt(np.maximum(sq_distances[np.arange(len(z)), clusters], 0))
+    
+    # Confidence from distance to the centroid and cluster statistics
+    normalized_distance = distance / (table['spread'][clusters] + 1e-6)
+    distance_confidence = 1 / (1 + normalized_distance)
+    confidence = 0.6 * distance_confidence + 0.4 * table['density'][clusters]
+    
+    # Clusters with no training points get zero confidence
+    confidence = np.clip(np.where(table['counts'][clusters] > 0, confidence, 0.0), 0, 1)
+    
+    return {
+        'risk_level': table['risk_level'][clusters],
+        'movement_risk_score': table['risk_score'][clusters],
+        'confidence': confidence,
+        'cluster': clusters
+    }
+
+def _first_prediction(scores):
+    """Single-sample prediction dict from batch scores"""
+    return {
+        'risk_level': str(scores['risk_level'][0]),
+        'movement_risk_score': scores['movement_risk_score'][0],
+        'confidence': scores['confidence'][0],
+        'cluster': scores['cluster'][0]
+    }
+
+class RiskSnapshot:
+    """
+    Read-only scoring view of a fitted predictor
+    
+    Holds the cluster table the predictor had when the snapshot was taken
+    (shared, not copied; the table owns its arrays, and they are marked
+    read-only). Scoring never mutates anything, so one snapshot can be used
+    from any number of threads at once; later partial_update or retuning of
+    the predictor publishes a new table and leaves existing snapshots as
+    they were.
+    """
+    def __init__(self, table):
+        for array in table.values():
+            array.setflags(write=False)
+        self.table = table
+    
+    def predict_risk(self, landmark_data, confidence_threshold=0.7):
+        """Same as RealTimeRiskPredictor.predict_risk"""
+        return _first_prediction(score_cluster_table(self.table, np.atleast_2d(landmark_data)[:1]))
+    
+    def predict_risk_batch(self, landmark_data, confidence_threshold=0.7):
+        """Same as RealTimeRiskPredictor.predict_risk_batch"""
+        return score_cluster_table(self.table, landmark_data)
 
 class RealTimeRiskPredictor:
-    def __init__(self, mediapipe_path, google_forms_path):
+    def __init__(self, mediapipe_path, google_forms_path,
+                 memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, silhouette_sample_size=None):
         self.mediapipe_path = mediapipe_path
         self.google_forms_path = google_forms_path
-        self.scaler = StandardScaler()
+        # Working-memory cap for the distance kernels, and an optional sample
+        # size for estimating silhouette scores on large datasets
+        self.memory_budget_mb = memory_budget_mb
+        self.silhouette_sample_size = silhouette_sample_size
+        # The scaler is built on first use; a loaded model keeps its moments
+        # in _scaler_state so scoring never needs to import sklearn
+        self._scaler = None
+        self._scaler_state = None
         self.kmeans = None
+        self._kmeans_fit_data = None
         self.movement_thresholds = None
         self.cluster_risk_mapping = None
         self.optimal_clusters = None
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        self.cluster_table = None
+        self.risk_sketch = None
+        self.training_data_hash = None
+        self.cv_report = None
+        self._pose = None
+        # Serialises partial_update calls; readers never take it
+        self._update_lock = threading.Lock()
+    
+    @property
+    def scaler(self):
+        """StandardScaler for the landmark features, created on first use"""
+        if self._scaler is None:
+            from sklearn.preprocessing import StandardScaler
+            scaler = StandardScaler()
+            if self._scaler_state is not None:
+                # Restore the fitted scaler
+                scaler.mean_ = self._scaler_state['mean']
+                scaler.scale_ = self._scaler_state['scale']
+                scaler.var_ = self._scaler_state['var']
+                scaler.n_features_in_ = len(scaler.mean_)
+            self._scaler = scaler
+        return self._scaler
+    
+    def _scaler_moments(self):
+        """(mean, scale, var) of the fitted scaler, without building it for a loaded model"""
+        if self._scaler is None and self._scaler_state is not None:
+            state = self._scaler_state
+            return state['mean'], state['scale'], state['var']
+        return self.scaler.mean_, self.scaler.scale_, self.scaler.var_
+    
+    @property
+    def mp_pose(self):
+        """MediaPipe's pose solution module, imported on first use"""
+        import mediapipe as mp
+        return mp.solutions.pose
+    
+    @property
+    def pose(self):
+        """MediaPipe Pose graph, created on first use"""
+        if self._pose is None:
+            self._pose = self.mp_pose.Pose(
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+        return self._pose
         
     def extract_advanced_features(self, landmarks):
         """Extract advanced movement pattern features"""
@@ -110,8 +287,13 @@ class RealTimeRiskPredictor:
         
         return np.array(features)
     
-    def collect_training_data(self, video_path, output_path, num_frames=100):
+    def extract_advanced_features_batch(self, landmarks):
+        """Extract advanced features for an (N, 33, 4) landmark array"""
+        return extract_advanced_features_batch(landmarks)
+    
+    def collect_training_data(self, video_path, output_path, num_frames=100, preview=True):
         """Collect training data from video"""
+        import cv2
         print(f"Collecting training data from {video_path}...")
         
         cap = cv2.VideoCapture(video_path)
@@ -149,12 +331,14 @@ class RealTimeRiskPredictor:
                 frame_count += 1
                 
                 # Visualize the frame
-                cv2.imshow('Collecting Training Data', frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+                if preview:
+                    cv2.imshow('Collecting Training Data', frame)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
         
         cap.release()
-        cv2.destroyAllWindows()
+        if preview:
+            cv2.destroyAllWindows()
         
         if frames:
             # Save collected data
@@ -164,41 +348,268 @@ class RealTimeRiskPredictor:
         else:
             print("No valid frames collected")
     
-    def load_and_preprocess_data(self):
-        """Load and preprocess MediaPipe dataset"""
-        mediapipe_df = pd.read_csv(self.mediapipe_path)
+    def ingest_video(self, video_path, output_path, stride=1, target_fps=None, max_side=None,
+                     preview=False, batch_size=256, pose_settings=None):
+        """
+        Extract landmarks and advanced features from a whole video, headless
+        
+        Frames are decoded on a background thread; every stride-th frame (or
+        enough frames to sample at target_fps) is run through Pose. Rows of
+        frame index, timestamp, landmark columns and ADVANCED_FEATURE_NAMES
+        are streamed to output_path in batches of batch_size, so memory stays
+        flat for any video length. Preview is off by default; when on, press
+        'q' to stop early. Returns a dict of throughput statistics.
+        """
+        import cv2
+        from video_io import VideoFrameReader
+        print(f"Ingesting video {video_path}...")
+        
+        try:
+            reader = VideoFrameReader(video_path, stride=stride, target_fps=target_fps, max_side=max_side)
+        except IOError as e:
+            print(f"Error: {e}")
+            return None
+        
+        settings = dict(VIDEO_POSE_SETTINGS)
+        if pose_settings:
+            settings.update(pose_settings)
+        pose = create_pose(settings)
+        
+        frame_indices = []
+        timestamps = []
+        landmark_rows = []
+        frames_processed = 0
+        poses_detected = 0
+        
+        def flush(writer):
+            """Compute features for the buffered frames in one batch and write them"""
+            if not landmark_rows:
+                return
+            landmarks = np.array(landmark_rows)
+            features = extract_advanced_features_batch(landmarks)
+            flat = landmarks.reshape(len(landmarks), -1)
+            for i in range(len(landmarks)):
+                writer.writerow([frame_indices[i], f"{timestamps[i]:.1f}"] + flat[i].tolist() + features[i].tolist())
+            frame_indices.clear()
+            timestamps.clear()
+            landmark_rows.clear()
+        
+        start_time = time.perf_counter()
+        with open(output_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'timestamp_ms'] + landmark_columns() + ADVANCED_FEATURE_NAMES)
+            try:
+                for frame_index, timestamp_ms, frame in reader:
+                    results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    frames_processed += 1
+                    
+                    if results.pose_landmarks:
+                        poses_detected += 1
+                        frame_indices.append(frame_index)
+                        timestamps.append(timestamp_ms)
+                        landmark_rows.append(landmarks_to_array(results.pose_landmarks.landmark))
+                        if len(landmark_rows) >= batch_size:
+                            flush(writer)
+                            f.flush()
+                    
+                    if preview:
+                        cv2.imshow('Ingesting Video', frame)
+                        if cv2.waitKey(1) & 0xFF == ord('q'):
+                            break
+                flush(writer)
+            finally:
+                reader.close()
+                pose.close()
+                if preview:
+                    cv2.destroyAllWindows()
+        
+        elapsed = time.perf_counter() - start_time
+        video_seconds = reader.frames_read / reader.source_fps if reader.source_fps > 0 else 0.0
+        stats = {
+            'frames_read': reader.frames_read,
+            'frames_processed': frames_processed,
+            'poses_detected': poses_detected,
+            'stride': reader.stride,
+            'elapsed_seconds': elapsed,
+            'processed_fps': frames_processed / elapsed if elapsed > 0 else 0.0,
+            'read_fps': reader.frames_read / elapsed if elapsed > 0 else 0.0,
+            'speedup_vs_realtime': video_seconds / elapsed if elapsed > 0 else 0.0
+        }
+        
+        print(f"Read {stats['frames_read']} frames (stride {stats['stride']}), processed {frames_processed}, "
+              f"detected {poses_detected} poses in {elapsed:.1f}s")
+        print(f"Throughput: {stats['processed_fps']:.1f} processed frames/sec, "
+              f"{stats['read_fps']:.1f} video frames/sec ({stats['speedup_vs_realtime']:.1f}x real time)")
+        print(f"Saved to {output_path}")
+        return stats
+    
+    def run_live(self, source=0, latency_budget_ms=150, duration=None, max_predictions=None,
+                 preview=False, adaptive=True, on_prediction=None, session=None):
+        """
+        Score a live camera with bounded glass-to-risk latency
+        
+        A capture thread keeps only the newest frame, so every inference
+        starts from the latest image and stale frames are dropped instead of
+        queued. Latency is measured from frame capture to the finished risk
+        prediction. With adaptive on, frames are downscaled a step further
+        whenever the smoothed latency exceeds latency_budget_ms, and scaled
+        back up once there is headroom. Each prediction carries its
+        latency_ms and the temporal features of an AthleteSession (a new one
+        unless session is given), and is passed to on_prediction if given. Runs until the
+        source ends, duration seconds pass, max_predictions are made or 'q'
+        is pressed in the preview. Returns a dict of latency and fps stats.
+        """
+        import cv2
+        from video_io import LatestFrameGrabber
+        try:
+            grabber = LatestFrameGrabber(source)
+        except IOError as e:
+            print(f"Error: {e}")
+            return None
+        
+        pose = create_pose(VIDEO_POSE_SETTINGS)
+        if session is None:
+            session = AthleteSession()
+        latencies = deque(maxlen=10000)
+        smoothed_latency = None
+        step = 0
+        predictions = 0
+        frames_processed = 0
+        over_budget = 0
+        
+        grabber.start()
+        start_time = time.perf_counter()
+        try:
+            while duration is None or time.perf_counter() - start_time < duration:
+                frame, captured_at = grabber.read()
+                if frame is None:
+                    break
+                frames_processed += 1
+                
+                image = downscale_image(frame, LIVE_MAX_SIDE_STEPS[step])
+                results = pose.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+                
+                prediction = None
+                if results.pose_landmarks:
+                    landmarks = landmarks_to_array(results.pose_landmarks.landmark)
+                    prediction = self.predict_risk(landmarks[:, :3].reshape(1, -1))
+                    session.update(landmarks, captured_at)
+                    prediction['session_features'] = session.feature_dict()
+                
+                latency_ms = (time.perf_counter() - captured_at) * 1000
+                latencies.append(latency_ms)
+                if latency_ms > latency_budget_ms:
+                    over_budget += 1
+                
+                # Step resolution down when over budget, up again with headroom
+                smoothed_latency = latency_ms if smoothed_latency is None else 0.8 * smoothed_latency + 0.2 * latency_ms
+                if adaptive:
+                    if smoothed_latency > latency_budget_ms and step < len(LIVE_MAX_SIDE_STEPS) - 1:
+                        step += 1
+                        smoothed_latency = None
+                    elif smoothed_latency < 0.5 * latency_budget_ms and step > 0:
+                        step -= 1
+                        smoothed_latency = None
+                
+                if prediction is not None:
+                    prediction['latency_ms'] = latency_ms
+                    predictions += 1
+                    if on_prediction is not None:
+                        on_prediction(prediction)
+                
+                if preview:
+                    if prediction is not None:
+                        cv2.putText(frame, f"{prediction['risk_level']} ({latency_ms:.0f} ms)", (10, 30),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                    cv2.imshow('Live Risk', frame)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+                
+                if max_predictions is not None and predictions >= max_predictions:
+                    break
+        finally:
+            elapsed = time.perf_counter() - start_time
+            capture_fps = grabber.capture_fps()
+            grabber.close()
+            pose.close()
+            if preview:
+                cv2.destroyAllWindows()
+        
+        latency_array = np.array(latencies) if latencies else np.zeros(1)
+        stats = {
+            'frames_captured': grabber.frames_captured,
+            'frames_processed': frames_processed,
+            'frames_dropped': grabber.frames_dropped,
+            'predictions': predictions,
+            'capture_fps': capture_fps,
+            'effective_fps': frames_processed / elapsed if elapsed > 0 else 0.0,
+            'latency_p50_ms': float(np.percentile(latency_array, 50)),
+            'latency_p95_ms': float(np.percentile(latency_array, 95)),
+            'latency_max_ms': float(np.max(latency_array)),
+            'over_budget': over_budget,
+            'final_max_side': LIVE_MAX_SIDE_STEPS[step]
+        }
+        
+        print(f"Live: {frames_processed} frames processed, {stats['frames_dropped']} dropped, "
+              f"{stats['effective_fps']:.1f} fps (camera {capture_fps:.1f} fps)")
+        print(f"Glass-to-risk latency: p50 {stats['latency_p50_ms']:.1f}ms, p95 {stats['latency_p95_ms']:.1f}ms, "
+              f"max {stats['latency_max_ms']:.1f}ms; {over_budget} over the {latency_budget_ms}ms budget")
+        return stats
+    
+    def load_and_preprocess_data(self, fit=None):
+        """Load and preprocess MediaPipe dataset
+        
+        The scaler is fitted (and the training data hash recorded) when fit
+        is True, or by default only while the predictor is unfitted. A
+        trained or loaded predictor scales with its stored moments, which
+        its cluster table was built against, and keeps its data hash.
+        """
+        mediapipe_df = load_landmark_frame(self.mediapipe_path)
         
         # Extract landmark columns
         landmark_cols = [col for col in mediapipe_df.columns 
                         if col.startswith('landmark_') and not col.endswith('_visibility')]
         
         X = mediapipe_df[landmark_cols]
+        if fit is None:
+            fit = self._scaler_state is None and not hasattr(self._scaler, 'mean_')
         
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
+        if fit:
+            self.training_data_hash = hashlib.sha256(
+                np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes()
+            ).hexdigest()
+            # Start from a fresh scaler rather than refitting a restored one
+            self._scaler = None
+            self._scaler_state = None
+            X_scaled = self.scaler.fit_transform(X)
+        else:
+            scaler_mean, scaler_scale, _ = self._scaler_moments()
+            X_scaled = (X.to_numpy(dtype=np.float64) - scaler_mean) / scaler_scale
         
         return X_scaled, mediapipe_df
     
     def find_optimal_clusters(self, X_scaled):
         """Find optimal number of clusters using silhouette score"""
-        silhouette_scores = []
-        n_clusters_range = range(2, 6)
-        
-        for n_clusters in n_clusters_range:
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-            cluster_labels = kmeans.fit_predict(X_scaled)
-            silhouette_avg = silhouette_score(X_scaled, cluster_labels)
-            silhouette_scores.append(silhouette_avg)
+        optimal_clusters, kmeans, _ = select_cluster_count(
+            X_scaled,
+            memory_budget_mb=self.memory_budget_mb,
+            silhouette_sample_size=self.silhouette_sample_size
+        )
         
-        optimal_clusters = n_clusters_range[np.argmax(silhouette_scores)]
+        # Keep the fitted winner so calculate_movement_risk can reuse its labels
         self.optimal_clusters = optimal_clusters
-        self.kmeans = KMeans(n_clusters=optimal_clusters, random_state=42)
+        self.kmeans = kmeans
+        self._kmeans_fit_data = X_scaled
         
         return optimal_clusters
     
     def calculate_movement_risk(self, X_scaled):
         """Calculate movement risk scores using clustering"""
-        cluster_labels = self.kmeans.fit_predict(X_scaled)
+        if X_scaled is self._kmeans_fit_data:
+            cluster_labels = self.kmeans.labels_
+        else:
+            cluster_labels = self.kmeans.fit_predict(X_scaled)
+            self._kmeans_fit_data = X_scaled
         
         # Calculate movement intensity for each cluster
         movement_intensity = []
@@ -230,8 +641,8 @@ class RealTimeRiskPredictor:
             cluster_data = X_scaled[cluster_labels == i]
             if len(cluster_data) > 1:
                 # Calculate average distance between points in cluster
-                distances = np.mean(np.abs(cluster_data[:, np.newaxis] - cluster_data), axis=1)
-                density = 1 / (1 + np.mean(distances))
+                mean_distance = mean_abs_pairwise_difference(cluster_data, self.memory_budget_mb)
+                density = 1 / (1 + mean_distance)
             else:
                 density = 1.0
             cluster_density.append(density)
@@ -251,28 +662,70 @@ class RealTimeRiskPredictor:
     
     def tune_thresholds(self, movement_risk_scores):
         """Tune risk thresholds using cross-validation"""
+        # Track the score distribution in a streaming quantile sketch, so the
+        # thresholds can follow new sessions without the full history
+        self.risk_sketch = QuantileSketch()
+        self.risk_sketch.update_many(movement_risk_scores)
+        return self._thresholds_from_sketch()
+    
+    def _thresholds_from_sketch(self):
+        """Derive the low/medium/high thresholds from the risk score sketch"""
         # Calculate dynamic thresholds based on distribution
-        scores = np.array(movement_risk_scores)
+        low, median, high = self.risk_sketch.quantiles([0.2, 0.5, 0.8])
         
         # Use more balanced thresholds with overlapping ranges
-        self.movement_thresholds = {
-            'low': np.percentile(scores, 20),  # Bottom fifth
-            'medium': np.percentile(scores, 50),  # Median
-            'high': np.percentile(scores, 80)  # Top fifth
+        thresholds = {
+            'low': low,  # Bottom fifth
+            'medium': median,  # Median
+            'high': high  # Top fifth
         }
         
         # Add larger overlap between categories
         overlap = 0.1
-        self.movement_thresholds['medium'] = (self.movement_thresholds['low'] + self.movement_thresholds['high']) / 2
-        self.movement_thresholds['low'] = max(0, self.movement_thresholds['low'] - overlap)
-        self.movement_thresholds['high'] = min(1, self.movement_thresholds['high'] + overlap)
+        thresholds['medium'] = (thresholds['low'] + thresholds['high']) / 2
+        thresholds['low'] = max(0, thresholds['low'] - overlap)
+        thresholds['high'] = min(1, thresholds['high'] + overlap)
+        
+        self.movement_thresholds = thresholds
+        return thresholds['medium']
+    
+    def observe_risk_scores(self, movement_risk_scores, retune=True):
+        """
+        Add new risk scores (e.g. from live predictions) to the threshold sketch
         
-        return self.movement_thresholds['medium']
+        With retune on, the thresholds are re-derived from the updated sketch
+        and the cluster table's risk bands are republished. Memory stays
+        constant however many scores are observed.
+        """
+        with self._update_lock:
+            if self.risk_sketch is None:
+                self.risk_sketch = QuantileSketch()
+            self.risk_sketch.update_many(movement_risk_scores)
+            if retune:
+                self._retune_from_sketch()
+        return self.movement_thresholds
+    
+    def merge_risk_sketch(self, sketch, retune=True):
+        """Fold a risk score sketch built elsewhere (e.g. another worker) into this one"""
+        with self._update_lock:
+            if self.risk_sketch is None:
+                self.risk_sketch = QuantileSketch(k=sketch.k)
+            self.risk_sketch.merge(sketch)
+            if retune:
+                self._retune_from_sketch()
+        return self.movement_thresholds
+    
+    def _retune_from_sketch(self):
+        """Recompute thresholds and republish the table with the new bands"""
+        self._thresholds_from_sketch()
+        if self.cluster_table is not None:
+            self.build_cluster_table(centers=self.cluster_table['centers'], counts=self.cluster_table['counts'],
+                                     labelled_counts=self.cluster_table['labelled_counts'])
     
     def train(self):
         """Train the risk predictor"""
         print("Loading and preprocessing data...")
-        X_scaled, mediapipe_df = self.load_and_preprocess_data()
+        X_scaled, mediapipe_df = self.load_and_preprocess_data(fit=True)
         
         print("Finding optimal number of clusters...")
         optimal_clusters = self.find_optimal_clusters(X_scaled)
@@ -283,130 +736,251 @@ class RealTimeRiskPredictor:
         
         print("Tuning risk thresholds...")
         optimal_threshold = self.tune_thresholds(movement_risk_scores)
+        self.build_cluster_table()
         
         # Perform cross-validation
         print("\nPerforming cross-validation...")
-        kf = KFold(n_splits=5, shuffle=True, random_state=42)
-        cv_scores = []
-        
         movement_risk_scores = np.array(movement_risk_scores)
+        self.cv_report = cross_validate_clusters(X_scaled, movement_risk_scores, self.optimal_clusters)
+        cv_scores = self.cv_report['scores']
         
-        for train_idx, val_idx in kf.split(X_scaled):
-            # Split data
-            X_train = X_scaled[train_idx]
-            X_val = X_scaled[val_idx]
-            movement_risk_train = movement_risk_scores[train_idx]
-            movement_risk_val = movement_risk_scores[val_idx]
-            
-            # Fit KMeans on training data
-            kmeans = KMeans(n_clusters=self.optimal_clusters, random_state=42)
-            kmeans.fit(X_train)
+        for result in self.cv_report['folds']:
+            print(f"Fold accuracy: {result['accuracy']:.3f}")
+        
+        print(f"\nCross-validation accuracy: {self.cv_report['mean_accuracy']:.3f} (+/- {self.cv_report['std_accuracy']:.3f})")
+        
+        # Figures are drawn in the background, after training
+        record_plot('learning_curves.png', 'line_plot',
+                    x=np.arange(1, len(cv_scores) + 1), y=np.asarray(cv_scores),
+                    xlabel='Fold', ylabel='Accuracy', title='Cross-validation Accuracy Across Folds')
+        record_plot('cluster_risk_distribution.png', 'histogram',
+                    values=movement_risk_scores, hue=np.asarray(cluster_labels),
+                    value_name='Risk Score', hue_name='Cluster', xlabel=None, ylabel=None,
+                    title='Risk Score Distribution by Cluster')
+        
+        return optimal_threshold
+    
+    def build_cluster_table(self, centers=None, counts=None, labelled_counts=None):
+        """Precompute the per-cluster lookup table used for prediction
+        
+        The StandardScaler is folded into the centroids: with
+        z = x / scale, the scaled distance ||(x - mean) / scale - c|| equals
+        ||z - (c + mean / scale)||, so a prediction is one small distance
+        computation against k folded centroids plus a table lookup.
+        Centroids and per-cluster training counts default to the fitted
+        KMeans model, and the counts of frames behind each risk score to
+        the training counts (every training frame is labelled); the table keeps its own copies, so freezing it for a
+        RiskSnapshot never touches the model's arrays. The finished table is published with a single
+        attribute assignment, so concurrent predictions see either the old
+        table or the new one, never a mix.
+        """
+        if centers is None:
+            centers = self.kmeans.cluster_centers_
+        centers = np.array(centers, dtype=np.float64)
+        n_clusters = len(centers)
+        scaler_mean, scaler_scale, _ = self._scaler_moments()
+        inv_scale = 1.0 / scaler_scale
+        folded_centers = centers + scaler_mean * inv_scale
+        
+        # Cluster statistics used for confidence
+        spread = np.std(centers, axis=1)
+        density = np.clip(centers.shape[1] / (spread + 1e-6) / 100, 0, 1)
+        if counts is None:
+            counts = np.bincount(self.kmeans.labels_, minlength=n_clusters)
+        counts = np.array(counts, dtype=np.int64)
+        labelled_counts = np.array(counts if labelled_counts is None else labelled_counts, dtype=np.int64)
+        
+        # Risk score and threshold band of each cluster
+        risk_score = np.array([self.cluster_risk_mapping[i] for i in range(n_clusters)])
+        risk_level = np.where(
+            risk_score <= self.movement_thresholds['low'], 'low',
+            np.where(risk_score < self.movement_thresholds['high'], 'medium', 'high')
+        )
+        
+        self.cluster_table = {
+            'centers': centers,
+            'inv_scale': inv_scale,
+            'folded_centers': folded_centers,
+            'center_sq_norms': np.sum(folded_centers ** 2, axis=1),
+            'spread': spread,
+            'density': density,
+            'counts': counts,
+            'labelled_counts': labelled_counts,
+            'risk_score': risk_score,
+            'risk_level': risk_level
+        }
+        return self.cluster_table
+    
+    def partial_update(self, landmark_data, movement_risk_scores=None, batch_size=256):
+        """
+        Fold new frames into the clusters without revisiting training data
+        
+        landmark_data is an (N, D) array of unscaled landmark features, as
+        passed to predict_risk. Frames are processed in mini-batches: each
+        is assigned to its nearest centroid, and every centroid moves to the
+        running mean of all points ever assigned to it (the mini-batch
+        KMeans update with per-cluster learning rate 1 / count). When
+        movement_risk_scores are given, each cluster's risk score is updated
+        as the running mean over its labelled frames only, weighted by a
+        separate labelled count; unlabelled frames only move the centroids. The scaler and thresholds stay
+        fixed. Cost is proportional to the new data.
+        
+        The updated table is built off to the side and published in one
+        assignment, so live scoring never sees a half-updated model.
+        Returns a summary of the update.
+        """
+        landmark_data = np.atleast_2d(np.asarray(landmark_data, dtype=np.float64))
+        if movement_risk_scores is not None:
+            movement_risk_scores = np.asarray(movement_risk_scores, dtype=np.float64)
+            if len(movement_risk_scores) != len(landmark_data):
+                raise ValueError("movement_risk_scores must have one entry per frame")
+        
+        with self._update_lock:
+            table = self.cluster_table
+            if table is None:
+                table = self.build_cluster_table()
+            centers = table['centers'].copy()
+            counts = table['counts'].astype(np.float64)
+            labelled_counts = table['labelled_counts'].astype(np.float64)
+            risk_score = table['risk_score'].astype(np.float64)
+            n_clusters = len(centers)
+            assigned = np.zeros(n_clusters, dtype=np.int64)
+            scaler_mean, scaler_scale, _ = self._scaler_moments()
             
-            # Predict on validation data
-            val_clusters = kmeans.predict(X_val)
+            for start in range(0, len(landmark_data), batch_size):
+                z = (landmark_data[start:start + batch_size] - scaler_mean) / scaler_scale
+                sq_distances = (np.sum(z ** 2, axis=1)[:, np.newaxis] - 2 * z @ centers.T
+                                + np.sum(centers ** 2, axis=1))
+                labels = np.argmin(sq_distances, axis=1)
+                
+                batch_counts = np.bincount(labels, minlength=n_clusters)
+                one_hot = np.zeros((len(z), n_clusters))
+                one_hot[np.arange(len(z)), labels] = 1
+                batch_sums = one_hot.T @ z
+                
+                new_counts = counts + batch_counts
+                touched = batch_counts > 0
+                centers[touched] += ((batch_sums[touched] - batch_counts[touched, np.newaxis] * centers[touched])
+                                     / new_counts[touched, np.newaxis])
+                
+                if movement_risk_scores is not None:
+                    batch_risk = np.bincount(labels, weights=movement_risk_scores[start:start + batch_size],
+                                             minlength=n_clusters)
+                    labelled_counts += batch_counts
+                    risk_score[touched] += ((batch_risk[touched] - batch_counts[touched] * risk_score[touched])
+                                            / labelled_counts[touched])
+                counts = new_counts
+                assigned += batch_counts
             
-            # Map clusters to risk scores using training data
-            cluster_risk_mapping = {}
-            for i in range(self.optimal_clusters):
-                cluster_mask = (kmeans.labels_ == i)
-                if np.any(cluster_mask):
-                    cluster_risk_mapping[i] = np.mean(movement_risk_train[cluster_mask])
-                else:
-                    cluster_risk_mapping[i] = 0.0
+            shift = np.sqrt(np.sum((centers - table['centers']) ** 2, axis=1))
+            self.cluster_risk_mapping = {i: risk for i, risk in enumerate(risk_score)}
+            self.build_cluster_table(centers=centers, counts=counts.astype(np.int64),
+                                     labelled_counts=labelled_counts.astype(np.int64))
+        
+        return {
+            'frames': len(landmark_data),
+            'assigned': assigned,
+            'max_center_shift': float(np.max(shift)) if len(shift) else 0.0,
+            'labelled': movement_risk_scores is not None
+        }
+    
+    def save(self, path):
+        """Save the fitted state to a single versioned .npz file"""
+        if self.cluster_table is None:
+            self.build_cluster_table()
+        table = self.cluster_table
+        if self.risk_sketch is None:
+            self.risk_sketch = self._sketch_from_table(table)
+        scaler_mean, scaler_scale, scaler_var = self._scaler_moments()
+        # Write through a file object so np.savez never appends .npz and
+        # load(path) finds the file under the same name
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                schema_version=np.array(MODEL_SCHEMA_VERSION),
+                training_data_hash=np.array(self.training_data_hash or ''),
+                optimal_clusters=np.array(self.optimal_clusters),
+                scaler_mean=scaler_mean,
+                scaler_scale=scaler_scale,
+                scaler_var=scaler_var,
+                centers=table['centers'],
+                counts=table['counts'],
+                labelled_counts=table['labelled_counts'],
+                cluster_risk=table['risk_score'],
+                thresholds=np.array([self.movement_thresholds[level] for level in ('low', 'medium', 'high')]),
+                **self.risk_sketch.to_arrays(prefix='risk_sketch_')
+            )
+        print(f"Saved risk predictor to {path}")
+    
+    @classmethod
+    def load(cls, path, mediapipe_path=None, google_forms_path=None):
+        """Load a predictor saved with save(), ready to predict without training"""
+        with np.load(path, allow_pickle=False) as state:
+            schema_version = int(state['schema_version'])
+            if schema_version != MODEL_SCHEMA_VERSION:
+                raise ValueError(f"Unsupported risk predictor schema version {schema_version} "
+                                 f"(expected {MODEL_SCHEMA_VERSION})")
             
-            val_risk_scores = np.array([cluster_risk_mapping[label] for label in val_clusters])
+            predictor = cls(mediapipe_path, google_forms_path)
+            predictor.training_data_hash = str(state['training_data_hash']) or None
+            predictor.optimal_clusters = int(state['optimal_clusters'])
             
-            # Calculate accuracy (within 0.1 threshold)
-            accuracy = np.mean(np.abs(val_risk_scores - movement_risk_val) < 0.1)
-            cv_scores.append(accuracy)
+            # The fitted scaler is rebuilt from these only if it is used
+            predictor._scaler_state = {
+                'mean': state['scaler_mean'],
+                'scale': state['scaler_scale'],
+                'var': state['scaler_var']
+            }
             
-            print(f"Fold accuracy: {accuracy:.3f}")
-        
-        print(f"\nCross-validation accuracy: {np.mean(cv_scores):.3f} (+/- {np.std(cv_scores):.3f})")
-        
-        # Plot learning curves
-        plt.figure(figsize=(10, 6))
-        plt.plot(range(1, len(cv_scores) + 1), cv_scores, marker='o')
-        plt.xlabel('Fold')
-        plt.ylabel('Accuracy')
-        plt.title('Cross-validation Accuracy Across Folds')
-        plt.savefig('learning_curves.png')
-        plt.close()
-        
-        # Plot cluster distribution
-        plt.figure(figsize=(10, 6))
-        sns.histplot(data=pd.DataFrame({
-            'Cluster': cluster_labels,
-            'Risk Score': movement_risk_scores
-        }), x='Risk Score', hue='Cluster', bins=20)
-        plt.title('Risk Score Distribution by Cluster')
-        plt.savefig('cluster_risk_distribution.png')
-        plt.close()
+            low, medium, high = state['thresholds']
+            predictor.movement_thresholds = {'low': low, 'medium': medium, 'high': high}
+            predictor.cluster_risk_mapping = {i: risk for i, risk in enumerate(state['cluster_risk'])}
+            predictor.build_cluster_table(centers=state['centers'], counts=state['counts'],
+                                          labelled_counts=state['labelled_counts'])
+            predictor.risk_sketch = QuantileSketch.from_arrays(state, prefix='risk_sketch_')
         
-        return optimal_threshold
+        return predictor
+    
+    @staticmethod
+    def _sketch_from_table(table):
+        """
+        Rebuild the training risk score sketch from the cluster table
+        
+        Every training frame's score is its cluster's risk score, so
+        inserting each score weighted by its cluster count reproduces the
+        training distribution.
+        """
+        sketch = QuantileSketch()
+        for risk, count in zip(table['risk_score'], table['counts']):
+            sketch.update(risk, weight=count)
+        return sketch
+    
+    def _score(self, landmark_data):
+        """Score an (N, D) array against the cluster table"""
+        table = self.cluster_table
+        if table is None:
+            table = self.build_cluster_table()
+        return score_cluster_table(table, landmark_data)
+    
+    def snapshot(self):
+        """Read-only RiskSnapshot of the current model for use from other threads"""
+        table = self.cluster_table
+        if table is None:
+            with self._update_lock:
+                table = self.cluster_table if self.cluster_table is not None else self.build_cluster_table()
+        return RiskSnapshot(table)
     
     def predict_risk(self, landmark_data, confidence_threshold=0.7):
         """Predict risk in real-time with confidence scores"""
-        # Scale the input data
-        landmark_scaled = self.scaler.transform(landmark_data)
-        
-        # Get cluster prediction
-        cluster = self.kmeans.predict(landmark_scaled)[0]
-        
-        # Calculate movement risk score
-        movement_risk = self.cluster_risk_mapping[cluster]
-        
-        # Calculate confidence score based on multiple factors
-        cluster_center = self.kmeans.cluster_centers_[cluster]
-        distance = np.linalg.norm(landmark_scaled - cluster_center)
-        
-        # Get all points in this cluster from training
-        cluster_points = self.kmeans.labels_ == cluster
-        if np.any(cluster_points):
-            # Calculate cluster statistics
-            cluster_data = self.kmeans.cluster_centers_[cluster]
-            cluster_std = np.std(cluster_data)
-            cluster_density = len(cluster_data) / (cluster_std + 1e-6)
-            
-            # Calculate normalized distance
-            normalized_distance = distance / (cluster_std + 1e-6)
-            
-            # Calculate confidence based on multiple factors
-            distance_confidence = 1 / (1 + normalized_distance)
-            density_confidence = np.clip(cluster_density / 100, 0, 1)
-            
-            # Combine confidence factors
-            confidence = 0.6 * distance_confidence + 0.4 * density_confidence
-        else:
-            confidence = 0.0
-        
-        # Scale confidence to be between 0 and 1
-        confidence = np.clip(confidence, 0, 1)
-        
-        # Determine risk level with overlapping thresholds and soft boundaries
-        if movement_risk < self.movement_thresholds['low']:
-            risk_level = 'low'
-        elif movement_risk < self.movement_thresholds['medium']:
-            # Use sigmoid function for smooth transition
-            transition = 1 / (1 + np.exp(-10 * (movement_risk - self.movement_thresholds['low'])))
-            if np.random.random() < transition:
-                risk_level = 'low'
-            else:
-                risk_level = 'medium'
-        else:
-            # Use sigmoid function for smooth transition
-            transition = 1 / (1 + np.exp(-10 * (movement_risk - self.movement_thresholds['high'])))
-            if np.random.random() < transition:
-                risk_level = 'medium'
-            else:
-                risk_level = 'high'
+        return _first_prediction(self._score(np.atleast_2d(landmark_data)[:1]))
+    
+    def predict_risk_batch(self, landmark_data, confidence_threshold=0.7):
+        """Predict risk for many samples in one vectorised pass
         
-        return {
-            'risk_level': risk_level,
-            'movement_risk_score': movement_risk,
-            'confidence': confidence,
-            'cluster': cluster
-        }
+        Takes an (N, D) array and returns the same fields as predict_risk,
+        each as an array with one entry per sample.
+        """
+        return self._score(landmark_data)
     
     def evaluate_real_time_performance(self, num_samples=100):
         """Evaluate real-time performance"""
@@ -437,24 +1011,21 @@ class RealTimeRiskPredictor:
         
         print(f"Average prediction time: {avg_time*1000:.2f}ms (+/- {std_time*1000:.2f}ms)")
         
-        # Plot prediction time distribution
-        plt.figure(figsize=(10, 6))
-        sns.histplot(prediction_times, bins=20)
-        plt.xlabel('Prediction Time (seconds)')
-        plt.ylabel('Count')
-        plt.title('Distribution of Real-time Prediction Times')
-        plt.savefig('prediction_times.png')
-        plt.close()
+        # Measure batch throughput over the whole dataset
+        start_time = time.time()
+        self.predict_risk_batch(X_scaled)
+        batch_time = time.time() - start_time
+        print(f"Batch prediction: {len(X_scaled)} samples in {batch_time*1000:.2f}ms "
+              f"({len(X_scaled) / max(batch_time, 1e-9):.0f} samples/sec)")
         
-        # Plot risk level distribution
+        # Plot prediction time and risk level distributions
         risk_levels = [p['risk_level'] for p in predictions]
-        plt.figure(figsize=(10, 6))
-        sns.countplot(x=risk_levels)
-        plt.xlabel('Risk Level')
-        plt.ylabel('Count')
-        plt.title('Distribution of Predicted Risk Levels')
-        plt.savefig('risk_level_distribution.png')
-        plt.close()
+        record_plot('prediction_times.png', 'histogram',
+                    values=np.asarray(prediction_times), xlabel='Prediction Time (seconds)', ylabel='Count',
+                    title='Distribution of Real-time Prediction Times')
+        record_plot('risk_level_distribution.png', 'count_plot',
+                    values=risk_levels, xlabel='Risk Level', ylabel='Count',
+                    title='Distribution of Predicted Risk Levels')
         
         # Print prediction statistics
         print("\nPrediction Statistics:")
@@ -481,6 +1052,7 @@ def main():
     
     # Train the model
     optimal_threshold = predictor.train()
+    predictor.save(os.path.join(current_dir, 'risk_predictor.npz'))
     
     # Evaluate real-time performance
     predictor.evaluate_real_time_performance()
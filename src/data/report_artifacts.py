@@ -0,0 +1,270 @@
+import os
+import sys
+import json
+import atexit
+import queue
+import pickle
+import hashlib
+import threading
+import subprocess
+import numpy as np
+import report_plots
+
+# Set to 0/off/false to skip figures entirely, or to sync to draw them in
+# this process instead of the background renderer
+PLOTS_ENV_VAR = 'REPORT_PLOTS'
+
+# Per-directory record of the data hash each figure was last drawn from
+MANIFEST_NAME = '.report_artifacts.json'
+
+_END_OF_JOBS = None
+
+def plots_mode():
+    """'off', 'sync' or 'background', from the REPORT_PLOTS environment variable"""
+    value = os.environ.get(PLOTS_ENV_VAR, '').strip().lower()
+    if value in ('0', 'off', 'false', 'no'):
+        return 'off'
+    if value == 'sync':
+        return 'sync'
+    return 'background'
+
+def _update_hash(digest, value):
+    """Feed a canonical encoding of nested plot data into digest"""
+    if isinstance(value, dict):
+        digest.update(b'{')
+        for key in sorted(value):
+            digest.update(repr(key).encode())
+            _update_hash(digest, value[key])
+        digest.update(b'}')
+    elif isinstance(value, (list, tuple)) and not all(np.isscalar(item) for item in value):
+        digest.update(b'[')
+        for item in value:
+            _update_hash(digest, item)
+        digest.update(b']')
+    else:
+        array = np.ascontiguousarray(np.asarray(value))
+        digest.update(f'{array.dtype.str}{array.shape}'.encode())
+        digest.update(array.tobytes())
+
+_renderer_source_hash = None
+
+def data_hash(renderer, data):
+    """Hash of a figure's renderer, its data and the renderer code itself"""
+    global _renderer_source_hash
+    if _renderer_source_hash is None:
+        with open(report_plots.__file__, 'rb') as f:
+            _renderer_source_hash = hashlib.sha1(f.read()).hexdigest()
+    digest = hashlib.sha1(f'{_renderer_source_hash}:{renderer}'.encode())
+    _update_hash(digest, data)
+    return digest.hexdigest()
+
+def _manifest_path(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), MANIFEST_NAME)
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _render_job(path, renderer, data):
+    """Draw one figure with its report_plots renderer and save it to path"""
+    figure = getattr(report_plots, renderer)(**data)
+    try:
+        figure.savefig(path)
+    finally:
+        import matplotlib.pyplot as plt
+        plt.close(figure)
+
+class ReportArtifacts:
+    """
+    Record report figures now, draw them later and off the critical path
+
+    record() takes the figure's output path, the name of a report_plots
+    renderer and the data to draw. Figures whose renderer and data hash
+    match the last drawing of that file are skipped. Everything else is
+    sent to a background Python process that imports only matplotlib (Agg)
+    and seaborn, so training and evaluation never wait on drawing and
+    headless jobs never load a plotting stack. wait() blocks until queued
+    figures are written and records their hashes.
+
+    mode is 'background', 'sync' (draw inline) or 'off' (record nothing);
+    by default it comes from the REPORT_PLOTS environment variable.
+    """
+    def __init__(self, mode=None):
+        self.mode = mode or plots_mode()
+        self.rendered = 0
+        self.unchanged = 0
+        self.failed = []
+        self._pending = {}
+        self._process = None
+        self._jobs = None
+        self._results = []
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def record(self, path, renderer, **data):
+        """
+        Queue a figure; returns 'off', 'unchanged', 'queued' or 'rendered'
+        """
+        if self.mode == 'off':
+            return 'off'
+        if not hasattr(report_plots, renderer):
+            raise ValueError(f"Unknown plot renderer: {renderer}")
+        path = os.path.abspath(path)
+        figure_hash = data_hash(renderer, data)
+        if (os.path.exists(path)
+                and _read_manifest(_manifest_path(path)).get(os.path.basename(path)) == figure_hash):
+            self.unchanged += 1
+            return 'unchanged'
+
+        if self.mode == 'sync':
+            _render_job(path, renderer, data)
+            self._write_hashes({path: figure_hash})
+            self.rendered += 1
+            return 'rendered'
+
+        with self._lock:
+            if self._process is None:
+                self._start_renderer()
+            self._pending[path] = figure_hash
+            self._jobs.put((path, renderer, data))
+        return 'queued'
+
+    def _start_renderer(self):
+        env = dict(os.environ, MPLBACKEND='Agg')
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        # Jobs are written to the renderer from a feeder thread, so record()
+        # never waits on a full pipe while a figure is being drawn, and
+        # results are drained as they arrive so the renderer never blocks
+        self._jobs = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._feed_jobs, args=(self._process, self._jobs), daemon=True),
+            threading.Thread(target=self._read_results, args=(self._process,), daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _feed_jobs(self, process, jobs):
+        try:
+            while True:
+                job = jobs.get()
+                pickle.dump(job, process.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+                process.stdin.flush()
+                if job is _END_OF_JOBS:
+                    break
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    def _read_results(self, process):
+        for line in process.stdout:
+            self._results.append(json.loads(line))
+
+    def _write_hashes(self, hashes):
+        """Merge path -> hash entries into each directory's manifest"""
+        by_manifest = {}
+        for path, figure_hash in hashes.items():
+            by_manifest.setdefault(_manifest_path(path), {})[os.path.basename(path)] = figure_hash
+        for manifest_path, entries in by_manifest.items():
+            manifest = _read_manifest(manifest_path)
+            manifest.update(entries)
+            staging_path = manifest_path + '.tmp'
+            with open(staging_path, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(staging_path, manifest_path)
+
+    def wait(self):
+        """Wait for queued figures; returns counts of rendered, unchanged and failed"""
+        with self._lock:
+            process, self._process = self._process, None
+            pending, self._pending = self._pending, {}
+        if process is not None:
+            self._jobs.put(_END_OF_JOBS)
+            for thread in self._threads:
+                thread.join()
+            process.wait()
+            succeeded = {}
+            reported = set()
+            for result in self._results:
+                reported.add(result['path'])
+                if result['ok']:
+                    succeeded[result['path']] = pending[result['path']]
+                else:
+                    succeeded.pop(result['path'], None)
+                    self.failed.append((result['path'], result['error']))
+            # Anything never reported back died with the renderer
+            self.failed.extend((path, 'renderer exited early') for path in pending if path not in reported)
+            self._results = []
+            self._write_hashes(succeeded)
+            self.rendered += len(succeeded)
+        return {'rendered': self.rendered, 'unchanged': self.unchanged, 'failed': len(self.failed)}
+
+    close = wait
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wait()
+
+_default_artifacts = None
+
+def record_plot(path, renderer, **data):
+    """Queue a figure on the process-wide ReportArtifacts, drawn before exit"""
+    global _default_artifacts
+    if _default_artifacts is None:
+        _default_artifacts = ReportArtifacts()
+        atexit.register(flush_plots)
+    return _default_artifacts.record(path, renderer, **data)
+
+def flush_plots():
+    """Wait for every figure queued with record_plot and report the outcome"""
+    if _default_artifacts is None or _default_artifacts.mode == 'off':
+        return None
+    summary = _default_artifacts.wait()
+    if any(summary.values()):
+        print(f"Report figures: {summary['rendered']} drawn, {summary['unchanged']} unchanged, "
+              f"{summary['failed']} failed")
+    for path, error in _default_artifacts.failed:
+        print(f"Failed to draw {path}: {error}")
+    # Start counting afresh so a later flush only reports new figures
+    _default_artifacts.rendered = _default_artifacts.unchanged = 0
+    _default_artifacts.failed = []
+    return summary
+
+def _serve_render_jobs(jobs, results):
+    """Renderer process loop: unpickle (path, renderer, data) jobs until the end marker"""
+    while True:
+        try:
+            job = pickle.load(jobs)
+        except EOFError:
+            break
+        if job is _END_OF_JOBS:
+            break
+        path, renderer, data = job
+        try:
+            _render_job(path, renderer, data)
+            result = {'path': path, 'ok': True}
+        except Exception as e:
+            result = {'path': path, 'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        results.write(json.dumps(result) + '\n')
+        results.flush()
+
+if __name__ == "__main__":
+    # Keep the original stdout for results only and send anything else
+    # printed here (matplotlib or seaborn warnings, stray prints) to stderr,
+    # so the parent's reader only ever sees result lines
+    results = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    _serve_render_jobs(sys.stdin.buffer, results)
@@ -0,0 +1,148 @@
+import numpy as np
+
+# Figure renderers for report_artifacts. Each takes plain numpy/list data
+# and returns a matplotlib figure; matplotlib and seaborn are only imported
+# when a figure is actually drawn, always with the headless Agg backend.
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def _seaborn():
+    import seaborn as sns
+    return sns
+
+def line_plot(x, y, xlabel, ylabel, title):
+    """One series with point markers, e.g. accuracy per fold"""
+    plt = _pyplot()
+    figure = plt.figure(figsize=(10, 6))
+    plt.plot(x, y, marker='o')
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    return figure
+
+def histogram(values, title, xlabel=None, ylabel='Count', bins=20, hue=None, value_name='Value', hue_name='Group'):
+    """Histogram of values, optionally split by a hue array"""
+    plt = _pyplot()
+    sns = _seaborn()
+    figure = plt.figure(figsize=(10, 6))
+    if hue is None:
+        sns.histplot(np.asarray(values), bins=bins)
+    else:
+        import pandas as pd
+        sns.histplot(data=pd.DataFrame({hue_name: hue, value_name: values}), x=value_name, hue=hue_name, bins=bins)
+    if xlabel is not None:
+        plt.xlabel(xlabel)
+    if ylabel is not None:
+        plt.ylabel(ylabel)
+    plt.title(title)
+    return figure
+
+def histogram_panels(panels, figsize=(12, 6)):
+    """Side-by-side histograms; panels is a list of dicts with values, xlabel and title"""
+    plt = _pyplot()
+    sns = _seaborn()
+    figure = plt.figure(figsize=figsize)
+    for i, panel in enumerate(panels):
+        plt.subplot(1, len(panels), i + 1)
+        sns.histplot(np.asarray(panel['values']), bins=panel.get('bins', 20))
+        plt.xlabel(panel['xlabel'])
+        plt.ylabel('Count')
+        plt.title(panel['title'])
+    plt.tight_layout()
+    return figure
+
+def count_plot(values, xlabel, ylabel, title):
+    """Bar per distinct value with its number of occurrences"""
+    plt = _pyplot()
+    sns = _seaborn()
+    figure = plt.figure(figsize=(10, 6))
+    sns.countplot(x=list(values))
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    return figure
+
+def bar_plot(values, labels, xlabel, ylabel, title, figsize=(12, 8)):
+    """Horizontal bars, one per label"""
+    plt = _pyplot()
+    sns = _seaborn()
+    figure = plt.figure(figsize=figsize)
+    sns.barplot(x=list(values), y=list(labels))
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    return figure
+
+def cluster_scatter(scores, labels, n_clusters, xlabel, ylabel, title):
+    """Scores plotted in one column per cluster"""
+    plt = _pyplot()
+    scores = np.asarray(scores)
+    labels = np.asarray(labels)
+    figure = plt.figure(figsize=(10, 6))
+    for i in range(n_clusters):
+        cluster_scores = scores[labels == i]
+        plt.scatter(np.full_like(cluster_scores, i), cluster_scores, alpha=0.5, label=f'Cluster {i}')
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.legend()
+    return figure
+
+def roc_curve(fpr, tpr, roc_auc):
+    """Single ROC curve against the chance diagonal"""
+    plt = _pyplot()
+    figure = plt.figure()
+    plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC curve (AUC = {roc_auc:.2f})')
+    plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
+    plt.xlim([0.0, 1.0])
+    plt.ylim([0.0, 1.05])
+    plt.xlabel('False Positive Rate')
+    plt.ylabel('True Positive Rate')
+    plt.title('Receiver Operating Characteristic (ROC) Curve')
+    plt.legend(loc="lower right")
+    return figure
+
+def confusion_matrix(matrix):
+    """Annotated confusion matrix heatmap"""
+    plt = _pyplot()
+    sns = _seaborn()
+    figure = plt.figure(figsize=(8, 6))
+    sns.heatmap(np.asarray(matrix), annot=True, fmt='d', cmap='Blues')
+    plt.title('Confusion Matrix')
+    plt.ylabel('True Label')
+    plt.xlabel('Predicted Label')
+    return figure
+
+def roc_pr_curves(models):
+    """
+    ROC and precision-recall curves side by side
+
+    models is a list of dicts with name, fpr, tpr, roc_auc, precision,
+    recall and average_precision.
+    """
+    plt = _pyplot()
+    figure, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+
+    for model in models:
+        ax1.plot(model['fpr'], model['tpr'], label=f"{model['name']} (AUC = {model['roc_auc']:.2f})")
+    ax1.plot([0, 1], [0, 1], 'k--')
+    ax1.set_xlabel('False Positive Rate')
+    ax1.set_ylabel('True Positive Rate')
+    ax1.set_title('ROC Curves')
+    ax1.legend()
+    ax1.grid(True)
+
+    for model in models:
+        ax2.plot(model['recall'], model['precision'], label=f"{model['name']} (AP = {model['average_precision']:.2f})")
+    ax2.set_xlabel('Recall')
+    ax2.set_ylabel('Precision')
+    ax2.set_title('Precision-Recall Curves')
+    ax2.legend()
+    ax2.grid(True)
+
+    plt.tight_layout()
+    return figure
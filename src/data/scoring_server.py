@@ -0,0 +1,308 @@
+import os
+import json
+import time
+import asyncio
+import numpy as np
+from landmark_store import NUM_LANDMARKS, VALUES_PER_LANDMARK
+from pose_session import AthleteSession
+from real_time_evaluation import RealTimeRiskPredictor
+
+# Request line and header size limits for the minimal HTTP parser
+MAX_HEADER_BYTES = 16 * 1024
+MAX_LINE_BYTES = 64 * 1024
+
+class RiskBatcher:
+    """
+    Score frames from every session together in micro-batches
+
+    Sessions submit one frame at a time and await the result; the batcher
+    collects whatever is pending across all sessions and scores it in one
+    predict_risk_batch call, so per-frame cost falls as more athletes are
+    connected. A global semaphore caps how many frames can be waiting or
+    being scored at once.
+    """
+    def __init__(self, predictor, max_in_flight=256, max_batch_size=128):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.pending = asyncio.Queue()
+        self.frames_scored = 0
+        self.batches = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def score(self, features):
+        """Score one (D,) feature vector; waits while the in-flight cap is reached"""
+        async with self.in_flight:
+            future = asyncio.get_running_loop().create_future()
+            await self.pending.put((features, future))
+            return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self.pending.get()]
+            # Let sessions that are ready this tick join the batch
+            await asyncio.sleep(0)
+            while len(batch) < self.max_batch_size and not self.pending.empty():
+                batch.append(self.pending.get_nowait())
+
+            try:
+                scores = self.predictor.predict_risk_batch(np.stack([features for features, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.frames_scored += len(batch)
+            self.batches += 1
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result({
+                        'risk_level': str(scores['risk_level'][i]),
+                        'movement_risk_score': float(scores['movement_risk_score'][i]),
+                        'confidence': float(scores['confidence'][i]),
+                        'cluster': int(scores['cluster'][i])
+                    })
+
+def parse_frame(line):
+    """
+    Parse one NDJSON frame into ((33, 4) landmarks, timestamp or None)
+
+    A frame is either {"landmarks": [...], "timestamp": seconds} or a bare
+    list; landmarks may be nested or flat, with x, y, z, visibility per
+    landmark (visibility may be left out).
+    """
+    message = json.loads(line)
+    if isinstance(message, dict):
+        landmarks = message.get('landmarks')
+        timestamp = message.get('timestamp')
+    else:
+        landmarks, timestamp = message, None
+    try:
+        landmarks = np.asarray(landmarks, dtype=np.float64).reshape(NUM_LANDMARKS, -1)
+        timestamp = None if timestamp is None else float(timestamp)
+    except TypeError as e:
+        # e.g. {"landmarks": {"x": 1}} or a list timestamp
+        raise ValueError(f"Malformed frame: {e}") from e
+    if landmarks.shape[1] == 3:
+        landmarks = np.column_stack([landmarks, np.ones(NUM_LANDMARKS)])
+    if landmarks.shape[1] != VALUES_PER_LANDMARK:
+        raise ValueError(f"Expected 3 or 4 values per landmark, got {landmarks.shape[1]}")
+    return landmarks, timestamp
+
+async def _read_body_lines(reader, headers):
+    """Yield the request body line by line, for chunked or fixed-length bodies"""
+    buffer = b''
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                await reader.readline()
+                break
+            # Check the client's chunk size before reading it into memory
+            if size < 0 or size > MAX_LINE_BYTES - len(buffer):
+                raise ValueError("Frame line too long")
+            buffer += await reader.readexactly(size)
+            await reader.readexactly(2)
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                yield line
+            if len(buffer) > MAX_LINE_BYTES:
+                raise ValueError("Frame line too long")
+    else:
+        remaining = int(headers.get('content-length', 0))
+        while remaining > 0:
+            block = await reader.read(min(remaining, 65536))
+            if not block:
+                break
+            remaining -= len(block)
+            buffer += block
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                yield line
+            if len(buffer) > MAX_LINE_BYTES:
+                raise ValueError("Frame line too long")
+    if buffer.strip():
+        yield buffer
+
+class ScoringServer:
+    """
+    Asyncio HTTP service scoring many live athlete sessions against one model
+
+    POST /sessions/<athlete_id>/stream with an NDJSON body (one frame per
+    line, see parse_frame) streams back one NDJSON prediction per frame, in
+    order, over a chunked response. Each connection is one session with its
+    own AthleteSession for temporal features. GET /health returns service
+    statistics.
+
+    Backpressure is per session: frames are read into a queue of
+    session_queue_size, and when an athlete's client sends faster than it
+    is scored the server stops reading that socket, so TCP pushes back on
+    that client only. All sessions share the RiskBatcher and its global
+    max_in_flight cap.
+    """
+    def __init__(self, predictor, max_in_flight=256, session_queue_size=8, session_window=30):
+        self.predictor = predictor
+        self.session_queue_size = session_queue_size
+        self.session_window = session_window
+        self.batcher = RiskBatcher(predictor, max_in_flight=max_in_flight)
+        self.active_sessions = 0
+        self.total_sessions = 0
+        self.started_at = None
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.batcher.start()
+        self.started_at = time.monotonic()
+        server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_LINE_BYTES)
+        print(f"Risk scoring server listening on http://{host}:{port}")
+        return server
+
+    def stats(self):
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            'active_sessions': self.active_sessions,
+            'total_sessions': self.total_sessions,
+            'frames_scored': self.batcher.frames_scored,
+            'batches': self.batcher.batches,
+            'mean_batch_size': self.batcher.frames_scored / self.batcher.batches if self.batcher.batches else 0.0,
+            'frames_per_second': self.batcher.frames_scored / uptime if uptime > 0 else 0.0,
+            'uptime_seconds': uptime
+        }
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+
+            headers = {}
+            header_bytes = 0
+            while True:
+                line = await reader.readline()
+                header_bytes += len(line)
+                if header_bytes > MAX_HEADER_BYTES:
+                    await self._send_json(writer, 431, {'error': 'Headers too large'})
+                    return
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            parts = target.split('?')[0].strip('/').split('/')
+            if method == 'GET' and parts == ['health']:
+                await self._send_json(writer, 200, self.stats())
+            elif method == 'POST' and len(parts) == 3 and parts[0] == 'sessions' and parts[2] == 'stream':
+                await self._stream_session(parts[1], reader, writer, headers)
+            else:
+                await self._send_json(writer, 404, {'error': 'Not found'})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            await self._send_json(writer, 400, {'error': str(e)})
+        finally:
+            writer.close()
+
+    async def _send_json(self, writer, status, payload):
+        body = json.dumps(payload).encode()
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 431: 'Request Header Fields Too Large'}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def _stream_session(self, athlete_id, reader, writer, headers):
+        """Read frames into a bounded queue and stream predictions back in order"""
+        session = AthleteSession(athlete_id, window=self.session_window)
+        frames = asyncio.Queue(maxsize=self.session_queue_size)
+        self.active_sessions += 1
+        self.total_sessions += 1
+
+        read_errors = []
+        
+        async def read_frames():
+            try:
+                async for line in _read_body_lines(reader, headers):
+                    if line.strip():
+                        await frames.put(line)
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                read_errors.append(str(e) or 'Incomplete request body')
+            except ConnectionError:
+                pass
+            # Not in a finally: once the reader is cancelled the session is
+            # over, and nothing would drain a full queue to take the marker
+            await frames.put(None)
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        reading = asyncio.create_task(read_frames())
+        frame_index = 0
+        
+        def write_line(payload):
+            chunk = json.dumps(payload).encode() + b'\n'
+            writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+        
+        try:
+            while True:
+                line = await frames.get()
+                if line is None:
+                    break
+                received_at = time.perf_counter()
+                try:
+                    landmarks, timestamp = parse_frame(line)
+                    prediction = await self.batcher.score(landmarks[:, :3].reshape(-1))
+                    session.update(landmarks, timestamp)
+                    prediction['session_features'] = session.feature_dict()
+                except ValueError as e:
+                    prediction = {'error': str(e)}
+                prediction['athlete_id'] = athlete_id
+                prediction['frame'] = frame_index
+                prediction['latency_ms'] = (time.perf_counter() - received_at) * 1000
+                frame_index += 1
+
+                write_line(prediction)
+                await writer.drain()
+            
+            # Report a malformed body (e.g. an over-long line) before closing
+            for message in read_errors:
+                write_line({'error': message, 'athlete_id': athlete_id})
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            reading.cancel()
+            self.active_sessions -= 1
+
+async def serve(model_path, host='127.0.0.1', port=8765, max_in_flight=256, session_queue_size=8):
+    """Load a saved predictor and serve it until cancelled"""
+    predictor = RealTimeRiskPredictor.load(model_path)
+    scoring_server = ScoringServer(predictor, max_in_flight=max_in_flight, session_queue_size=session_queue_size)
+    server = await scoring_server.start(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await scoring_server.batcher.stop()
+
+def main():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    model_path = os.environ.get('RISK_MODEL_PATH', os.path.join(current_dir, 'risk_predictor.npz'))
+    host = os.environ.get('RISK_SERVER_HOST', '127.0.0.1')
+    port = int(os.environ.get('RISK_SERVER_PORT', 8765))
+    try:
+        asyncio.run(serve(model_path, host, port))
+    except KeyboardInterrupt:
+        print("Risk scoring server stopped")
+
+if __name__ == "__main__":
+    main()
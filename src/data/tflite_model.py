@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+KERAS_MODEL_PATH = os.path.join(MODELS_DIR, 'best_pose_model.h5')
+
+# Quantized variants written by export_tflite, next to the Keras model
+TFLITE_VARIANTS = ('float16', 'int8')
+
+# Which model load_pose_model serves: keras, float16 or int8
+BACKEND_ENV_VAR = 'POSE_MODEL_BACKEND'
+
+# Training rows used to calibrate the int8 activation ranges
+DEFAULT_CALIBRATION_SAMPLES = 500
+
+def tflite_path_for(variant, keras_model_path=KERAS_MODEL_PATH):
+    """Where export_tflite writes a variant, e.g. best_pose_model_int8.tflite"""
+    return os.path.splitext(keras_model_path)[0] + f'_{variant}.tflite'
+
+def _load_interpreter_class():
+    """The lightweight tflite_runtime interpreter if installed, else TensorFlow's"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+def export_tflite(calibration_data, keras_model_path=KERAS_MODEL_PATH, variants=TFLITE_VARIANTS,
+                  num_calibration_samples=DEFAULT_CALIBRATION_SAMPLES, random_state=42):
+    """
+    Convert the Keras pose model into quantized TFLite models
+
+    float16 stores the weights as half floats (about half the size, same
+    float kernels). int8 quantizes weights and activations and runs the
+    whole graph in integer arithmetic, including its input and output;
+    activation ranges are calibrated on up to num_calibration_samples rows
+    of calibration_data, which must be scaled exactly like the model's
+    training inputs. Returns {variant: path}.
+    """
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(keras_model_path)
+    calibration_data = np.asarray(calibration_data, dtype=np.float32)
+    rng = np.random.default_rng(random_state)
+    if len(calibration_data) > num_calibration_samples:
+        calibration_data = calibration_data[rng.choice(len(calibration_data), num_calibration_samples, replace=False)]
+
+    def representative_dataset():
+        for row in calibration_data:
+            yield [row[np.newaxis]]
+
+    paths = {}
+    for variant in variants:
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if variant == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+        elif variant == 'int8':
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+        else:
+            raise ValueError(f"Unknown TFLite variant '{variant}'. Choose from: {', '.join(TFLITE_VARIANTS)}")
+
+        path = tflite_path_for(variant, keras_model_path)
+        with open(path, 'wb') as f:
+            f.write(converter.convert())
+        paths[variant] = path
+        print(f"Exported {variant} TFLite model to {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+    return paths
+
+class TFLiteRiskModel:
+    """
+    Serve an exported TFLite pose model with a Keras-like predict()
+
+    Inputs are float feature rows scaled as for the Keras model; for an
+    int8 model they are quantized with the model's input scale and zero
+    point, and outputs are dequantized back to probabilities, so callers
+    see the same (N, outputs) float array model.predict returns. The
+    interpreter is resized only when the batch size changes. An
+    interpreter must not be shared between threads; build one per worker.
+    """
+    def __init__(self, model_path, num_threads=None):
+        Interpreter = _load_interpreter_class()
+        self.model_path = model_path
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads or os.cpu_count())
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self.input_details['shape'][0])
+
+    @staticmethod
+    def _quantization(details):
+        scale, zero_point = details['quantization']
+        return (scale, zero_point) if scale else None
+
+    def predict(self, X):
+        """Probabilities for an (N, features) array, as Keras model.predict"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        if len(X) != self._batch_size:
+            self.interpreter.resize_tensor_input(self.input_details['index'], [len(X), X.shape[1]])
+            self.interpreter.allocate_tensors()
+            self._batch_size = len(X)
+
+        input_dtype = self.input_details['dtype']
+        quantization = self._quantization(self.input_details)
+        if quantization is not None and np.issubdtype(input_dtype, np.integer):
+            scale, zero_point = quantization
+            limits = np.iinfo(input_dtype)
+            X = np.clip(np.round(X / scale + zero_point), limits.min, limits.max).astype(input_dtype)
+        self.interpreter.set_tensor(self.input_details['index'], X)
+        self.interpreter.invoke()
+
+        output = self.interpreter.get_tensor(self.output_details['index'])
+        quantization = self._quantization(self.output_details)
+        if quantization is not None and np.issubdtype(output.dtype, np.integer):
+            scale, zero_point = quantization
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output.astype(np.float32)
+
+def load_pose_model(backend=None, keras_model_path=KERAS_MODEL_PATH):
+    """
+    Load the pose model for inference
+
+    backend is 'keras', 'float16' or 'int8' (default: the POSE_MODEL_BACKEND
+    environment variable, else keras). Both kinds of model have predict().
+    """
+    backend = backend or os.environ.get(BACKEND_ENV_VAR, 'keras')
+    if backend == 'keras':
+        import tensorflow as tf
+        return tf.keras.models.load_model(keras_model_path)
+    if backend not in TFLITE_VARIANTS:
+        raise ValueError(f"Unknown pose model backend '{backend}'. Choose from: keras, {', '.join(TFLITE_VARIANTS)}")
+    return TFLiteRiskModel(tflite_path_for(backend, keras_model_path))
+
+def _latency_ms(predict, X, num_samples, batch_size):
+    """p50/p95 single-row latency and per-sample cost of batched calls, in ms"""
+    # Warm up so graph tracing and tensor allocation are not timed
+    predict(X[:1])
+    predict(X[:batch_size])
+
+    single = []
+    for row in X[:num_samples]:
+        start_time = time.perf_counter()
+        predict(row[np.newaxis])
+        single.append((time.perf_counter() - start_time) * 1000)
+
+    start_time = time.perf_counter()
+    for start in range(0, len(X), batch_size):
+        predict(X[start:start + batch_size])
+    batch_ms = (time.perf_counter() - start_time) * 1000
+
+    return {
+        'single_p50_ms': float(np.percentile(single, 50)),
+        'single_p95_ms': float(np.percentile(single, 95)),
+        'batch_ms_per_sample': batch_ms / len(X)
+    }
+
+def compare_with_keras(X, y=None, keras_model_path=KERAS_MODEL_PATH, variants=TFLITE_VARIANTS,
+                       num_latency_samples=200, batch_size=256, threshold=0.5):
+    """
+    Accuracy-delta and latency report for the TFLite variants against Keras
+
+    Every model scores X (scaled test features). For each variant the
+    report gives its file size, the max and mean absolute difference of its
+    probabilities from the Keras model's, how often the thresholded
+    predictions agree, the accuracy change when labels y are given, and
+    single-row and batched latency. The Keras baseline is timed through
+    model.predict, as the evaluation scripts call it.
+    """
+    import tensorflow as tf
+
+    X = np.asarray(X, dtype=np.float32)
+    keras_model = tf.keras.models.load_model(keras_model_path)
+    keras_predict = lambda batch: keras_model.predict(batch, verbose=0)
+    reference = keras_predict(X)
+
+    report = {'samples': len(X), 'threshold': threshold, 'models': {}}
+    models = [('keras', keras_model_path, keras_predict)]
+    for variant in variants:
+        tflite_model = TFLiteRiskModel(tflite_path_for(variant, keras_model_path))
+        models.append((variant, tflite_model.model_path, tflite_model.predict))
+
+    for name, path, predict in models:
+        probabilities = reference if name == 'keras' else predict(X)
+        delta = np.abs(probabilities - reference)
+        predictions = (probabilities.max(axis=1) > threshold).astype(int)
+        entry = {
+            'size_kb': os.path.getsize(path) / 1024,
+            'max_abs_delta': float(delta.max()),
+            'mean_abs_delta': float(delta.mean()),
+            'agreement': float(np.mean(predictions == (reference.max(axis=1) > threshold)))
+        }
+        if y is not None:
+            entry['accuracy'] = float(np.mean(predictions == np.asarray(y)))
+        entry.update(_latency_ms(predict, X, num_latency_samples, batch_size))
+        report['models'][name] = entry
+
+    if y is not None:
+        baseline = report['models']['keras']['accuracy']
+        for entry in report['models'].values():
+            entry['accuracy_delta'] = entry['accuracy'] - baseline
+    return report
+
+def print_report(report):
+    print(f"\nTFLite comparison on {report['samples']} samples:")
+    print("-" * 96)
+    print(f"{'Model':<10} {'Size KB':>9} {'Max |dp|':>10} {'Mean |dp|':>10} {'Agree':>8} "
+          f"{'Acc delta':>10} {'p50 ms':>8} {'p95 ms':>8} {'Batch ms/row':>13}")
+    print("-" * 96)
+    for name, entry in report['models'].items():
+        accuracy_delta = f"{entry['accuracy_delta']:+.4f}" if 'accuracy_delta' in entry else 'n/a'
+        print(f"{name:<10} {entry['size_kb']:>9.1f} {entry['max_abs_delta']:>10.4f} {entry['mean_abs_delta']:>10.5f} "
+              f"{entry['agreement']:>8.2%} {accuracy_delta:>10} {entry['single_p50_ms']:>8.3f} "
+              f"{entry['single_p95_ms']:>8.3f} {entry['batch_ms_per_sample']:>13.5f}")
+    print("-" * 96)
+
+def main():
+    from evaluate_model import load_and_preprocess_data
+
+    print("Loading and preprocessing data...")
+    X_train_scaled, X_test_scaled, y_train, y_test = load_and_preprocess_data()
+
+    print("Exporting TFLite models...")
+    export_tflite(X_train_scaled)
+
+    print("Comparing against the Keras model...")
+    report = compare_with_keras(X_test_scaled, y_test)
+    print_report(report)
+
+    report_path = os.path.join(MODELS_DIR, 'tflite_comparison.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved comparison report to {report_path}")
+
+if __name__ == "__main__":
+    main()
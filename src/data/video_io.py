@@ -0,0 +1,177 @@
+import time
+import queue
+import threading
+import cv2
+from process_mediapipe_dataset import _END_OF_STREAM, _put_until_stopped, downscale_image
+
+def sampling_stride(source_fps, stride=1, target_fps=None):
+    """
+    Number of source frames to advance between sampled frames
+
+    target_fps takes precedence over stride when the source frame rate is
+    known; sampling never goes faster than the source.
+    """
+    if target_fps and source_fps and source_fps > 0:
+        return max(1, int(round(source_fps / target_fps)))
+    return max(1, int(stride))
+
+class VideoFrameReader:
+    """
+    Decode a video file on a background thread
+
+    Iterating yields (frame_index, timestamp_ms, frame_bgr) for every
+    stride-th frame. Skipped frames are only grabbed, never decoded into an
+    image, so sparse sampling is much cheaper than reading every frame.
+    At most queue_size decoded frames are held in memory at once.
+    """
+    def __init__(self, video_path, stride=1, target_fps=None, max_side=None, queue_size=64):
+        self.video_path = video_path
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video file: {video_path}")
+        self.source_fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.stride = sampling_stride(self.source_fps, stride, target_fps)
+        self.max_side = max_side
+        self.frames_read = 0
+        self.frames_decoded = 0
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._decoder = None
+
+    def _timestamp_ms(self, frame_index):
+        if self.source_fps > 0:
+            return frame_index * 1000.0 / self.source_fps
+        return self.cap.get(cv2.CAP_PROP_POS_MSEC)
+
+    def _decode(self):
+        """Decoding thread: grab every frame, fully decode only the sampled ones"""
+        frame_index = 0
+        try:
+            while not self._stop_event.is_set():
+                if frame_index % self.stride:
+                    if not self.cap.grab():
+                        break
+                else:
+                    ret, frame = self.cap.read()
+                    if not ret:
+                        break
+                    self.frames_decoded += 1
+                    item = (frame_index, self._timestamp_ms(frame_index), downscale_image(frame, self.max_side))
+                    if not _put_until_stopped(self._frames, item, self._stop_event):
+                        return
+                frame_index += 1
+                self.frames_read = frame_index
+        finally:
+            _put_until_stopped(self._frames, _END_OF_STREAM, self._stop_event)
+
+    def __iter__(self):
+        self._decoder = threading.Thread(target=self._decode, daemon=True)
+        self._decoder.start()
+        try:
+            while True:
+                item = self._frames.get()
+                if item is _END_OF_STREAM:
+                    break
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the decoding thread and release the video file"""
+        self._stop_event.set()
+        if self._decoder is not None:
+            self._decoder.join()
+            self._decoder = None
+        self.cap.release()
+
+class LatestFrameGrabber:
+    """
+    Capture a live camera on a background thread, keeping only the newest frame
+
+    The capture thread reads continuously so the driver's buffer never backs
+    up; a frame that is replaced before anyone reads it counts as dropped.
+    read() always returns the most recent frame with the time it was
+    captured, so the consumer's latency cannot grow when it falls behind.
+    """
+    def __init__(self, source=0):
+        self.source = source
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video source: {source}")
+        # Ask the driver not to queue frames (not every backend honours it)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.frames_captured = 0
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.started_at = None
+        self._frame = None
+        self._captured_at = None
+        self._sequence = 0
+        self._last_read = 0
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._capture, daemon=True)
+        self._thread.start()
+        return self
+
+    def _capture(self):
+        """Capture thread: overwrite the held frame with every new one"""
+        while True:
+            ret, frame = self.cap.read()
+            captured_at = time.perf_counter()
+            with self._condition:
+                if self._stopped or not ret:
+                    self._stopped = True
+                    self._condition.notify_all()
+                    return
+                if self._sequence > self._last_read:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._captured_at = captured_at
+                self._sequence += 1
+                self.frames_captured += 1
+                self._condition.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Wait for a frame newer than the last one returned
+
+        Returns (frame_bgr, captured_at) with captured_at on the
+        time.perf_counter clock, or (None, None) on timeout or once the
+        source has ended.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence > self._last_read or self._stopped, timeout)
+            if self._sequence <= self._last_read:
+                return None, None
+            self._last_read = self._sequence
+            self.frames_delivered += 1
+            return self._frame, self._captured_at
+
+    def capture_fps(self):
+        """Rate at which the source has delivered frames so far"""
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.perf_counter() - self.started_at
+        return self.frames_captured / elapsed if elapsed > 0 else 0.0
+
+    def close(self):
+        """Stop capturing and release the camera"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.cap.release()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
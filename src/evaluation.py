@@ -1,9 +1,12 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
-from sklearn.metrics import roc_curve, auc, precision_recall_curve, average_precision_score
 from sklearn.preprocessing import StandardScaler
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+from metrics_engine import evaluate_scores, bootstrap_ci
+from report_artifacts import record_plot
 
 def load_and_preprocess_data(mediapipe_path, google_form_path):
     # Load datasets
@@ -25,45 +28,20 @@ def load_and_preprocess_data(mediapipe_path, google_form_path):
     return mediapipe_X_scaled, mediapipe_y, google_form_X_scaled, google_form_y
 
 def calculate_metrics(y_true, y_pred_proba):
-    # Calculate ROC curve
-    fpr, tpr, _ = roc_curve(y_true, y_pred_proba)
-    roc_auc = auc(fpr, tpr)
-    
-    # Calculate PR curve
-    precision, recall, _ = precision_recall_curve(y_true, y_pred_proba)
-    pr_auc = average_precision_score(y_true, y_pred_proba)
+    # ROC and PR curves from a single sort of the scores
+    metrics = evaluate_scores(y_true, y_pred_proba)
     
-    return fpr, tpr, roc_auc, precision, recall, pr_auc
+    return (metrics['fpr'], metrics['tpr'], metrics['roc_auc'],
+            metrics['precision_curve'], metrics['recall_curve'], metrics['average_precision'])
 
 def plot_curves(mediapipe_metrics, google_form_metrics):
-    fpr_mp, tpr_mp, roc_auc_mp, prec_mp, rec_mp, pr_auc_mp = mediapipe_metrics
-    fpr_gf, tpr_gf, roc_auc_gf, prec_gf, rec_gf, pr_auc_gf = google_form_metrics
-    
-    # Create figure with two subplots
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-    
-    # Plot ROC curves
-    ax1.plot(fpr_mp, tpr_mp, label=f'MediaPipe (AUC = {roc_auc_mp:.2f})')
-    ax1.plot(fpr_gf, tpr_gf, label=f'Google Form (AUC = {roc_auc_gf:.2f})')
-    ax1.plot([0, 1], [0, 1], 'k--')
-    ax1.set_xlabel('False Positive Rate')
-    ax1.set_ylabel('True Positive Rate')
-    ax1.set_title('ROC Curves')
-    ax1.legend()
-    ax1.grid(True)
-    
-    # Plot PR curves
-    ax2.plot(rec_mp, prec_mp, label=f'MediaPipe (AP = {pr_auc_mp:.2f})')
-    ax2.plot(rec_gf, prec_gf, label=f'Google Form (AP = {pr_auc_gf:.2f})')
-    ax2.set_xlabel('Recall')
-    ax2.set_ylabel('Precision')
-    ax2.set_title('Precision-Recall Curves')
-    ax2.legend()
-    ax2.grid(True)
-    
-    plt.tight_layout()
-    plt.savefig('evaluation_curves.png')
-    plt.close()
+    # ROC and PR curves for both datasets, drawn in the background
+    models = []
+    for name, metrics in (('MediaPipe', mediapipe_metrics), ('Google Form', google_form_metrics)):
+        fpr, tpr, roc_auc, precision, recall, pr_auc = metrics
+        models.append({'name': name, 'fpr': fpr, 'tpr': tpr, 'roc_auc': roc_auc,
+                       'precision': precision, 'recall': recall, 'average_precision': pr_auc})
+    record_plot('evaluation_curves.png', 'roc_pr_curves', models=models)
 
 def main():
     # Load and preprocess data
@@ -85,14 +63,15 @@ def main():
     # Plot results
     plot_curves(mediapipe_metrics, google_form_metrics)
     
-    # Print summary metrics
-    print("\nMediaPipe Metrics:")
-    print(f"ROC AUC: {mediapipe_metrics[2]:.3f}")
-    print(f"PR AUC: {mediapipe_metrics[5]:.3f}")
-    
-    print("\nGoogle Form Metrics:")
-    print(f"ROC AUC: {google_form_metrics[2]:.3f}")
-    print(f"PR AUC: {google_form_metrics[5]:.3f}")
+    # Print summary metrics with 95% bootstrap confidence intervals
+    for name, y_true, y_pred in (('MediaPipe', mediapipe_y, mediapipe_pred),
+                                 ('Google Form', google_form_y, google_form_pred)):
+        interval = bootstrap_ci(y_true, y_pred)
+        print(f"\n{name} Metrics:")
+        print(f"ROC AUC: {interval['roc_auc']['estimate']:.3f} "
+              f"(95% CI {interval['roc_auc']['lower']:.3f}-{interval['roc_auc']['upper']:.3f})")
+        print(f"PR AUC: {interval['average_precision']['estimate']:.3f} "
+              f"(95% CI {interval['average_precision']['lower']:.3f}-{interval['average_precision']['upper']:.3f})")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file